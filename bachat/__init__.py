@@ -0,0 +1,46 @@
+"""
+Bachat Kommittee pricing & risk engine, importable without the Streamlit UI.
+"""
+
+from .engine import (
+    ENGINE_VERSION, FLOAT32_RTOL, FORECAST_DTYPES, BachatConfig,
+    DiskForecastCache, ForecastAggregates, ForecastCache, ForecastCube,
+    ForecastTensor, IncrementalForecaster, LossSimulation, breakeven_table,
+    build_aggregates, build_forecast, build_forecast_tensor, build_scenarios,
+    build_slot_table, build_yearly_projection, cache_key, compact_forecast,
+    config_from_dict, config_hash, config_to_dict, cycle_economics,
+    cycle_economics_batch, run_scenarios, scenario_overrides,
+    simulate_default_losses, solve_breakeven, user_lifecycle, validate_config,
+)
+from .models import (
+    COMMON_COLUMNS, MODELS, ForecastModel, benchmark_models, diff_models,
+    get_model, register_model, run_model, run_models, stack_models,
+    summarize_models,
+)
+
+__all__ = [
+    "COMMON_COLUMNS", "MODELS", "ForecastModel", "benchmark_models",
+    "diff_models", "get_model", "register_model", "run_model", "run_models",
+    "stack_models", "summarize_models",
+    "ENGINE_VERSION", "FLOAT32_RTOL", "FORECAST_DTYPES", "BachatConfig",
+    "DiskForecastCache", "ForecastAggregates", "ForecastCache", "ForecastCube",
+    "ForecastTensor", "IncrementalForecaster", "LossSimulation",
+    "breakeven_table", "build_aggregates", "build_forecast",
+    "build_forecast_tensor", "build_scenarios", "build_slot_table",
+    "build_yearly_projection", "cache_key", "compact_forecast",
+    "config_from_dict", "config_hash", "config_to_dict", "cycle_economics",
+    "cycle_economics_batch",
+    "run_scenarios", "scenario_overrides", "simulate_default_losses",
+    "solve_breakeven", "user_lifecycle", "validate_config",
+    "export", "viz", "workbook",
+]
+
+
+def __getattr__(name: str):
+    # The plotly-backed chart layer and the pyarrow / xlsxwriter exporters are
+    # only imported on first access, so engine users (CLI, worker processes)
+    # never pay for them.
+    if name in ("viz", "export", "workbook"):
+        import importlib
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
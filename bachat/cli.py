@@ -0,0 +1,210 @@
+"""
+Headless batch runner for the Bachat engine.
+
+    python -m bachat configs/base.json configs/sweep.yaml --out runs/ \\
+        --format parquet --workers 4 --scenarios --yearly
+
+Each config file holds one BachatConfig mapping, a list of them, or
+{"configs": {name: mapping, ...}}.  List entries may carry a "name" key;
+otherwise configs are named after the file (plus an index for lists).
+Parquet and Arrow IPC outputs carry the config as schema metadata (see
+bachat.export).  Only the engine is imported — no streamlit, no plotly.
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .engine import (
+    FORECAST_DTYPES, BachatConfig, DiskForecastCache, build_forecast,
+    build_scenarios, build_yearly_projection, compact_forecast,
+    config_from_dict, scenario_overrides, validate_config,
+)
+
+FORMATS = ("parquet", "arrow", "csv")
+
+
+# =============================================================================
+# LOADING
+# =============================================================================
+
+def _read_file(path: str):
+    with open(path, "r", encoding="utf-8") as fh:
+        text = fh.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ValueError(f"{path}: reading YAML needs PyYAML "
+                             f"(pip install pyyaml)") from exc
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def load_configs(path: str) -> List[Tuple[str, BachatConfig]]:
+    """Parse one JSON / YAML file into [(name, BachatConfig), ...]."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    data = _read_file(path)
+    if isinstance(data, dict) and "configs" in data:
+        data = data["configs"]
+        if isinstance(data, dict):
+            return [(str(name), config_from_dict(entry or {}))
+                    for name, entry in data.items()]
+    if isinstance(data, dict):
+        return [(stem, config_from_dict(data))]
+    if isinstance(data, list):
+        out = []
+        for i, entry in enumerate(data, start=1):
+            if not isinstance(entry, dict):
+                raise ValueError(f"{path}: entry {i} is not a mapping")
+            entry = dict(entry)
+            name  = str(entry.pop("name", f"{stem}_{i}"))
+            out.append((name, config_from_dict(entry)))
+        return out
+    raise ValueError(f"{path}: expected a mapping or a list of mappings")
+
+
+# =============================================================================
+# RUNNING
+# =============================================================================
+
+def _write(df, path: str, fmt: str, cfg: BachatConfig, kind: str,
+           extra: Optional[Dict] = None) -> None:
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+    from .export import forecast_table, write_table
+    write_table(forecast_table(df, cfg, kind, extra), path, fmt)
+
+
+def run_job(name: str, cfg: BachatConfig, out_dir: str, fmt: str = "parquet",
+            scenarios: bool = False, yearly: bool = False,
+            cache_dir: Optional[str] = None, dtypes: str = "default",
+            excel: bool = False) -> Dict:
+    """Run one config and write its outputs; returns a summary row."""
+    t0    = time.perf_counter()
+    cache = DiskForecastCache(cache_dir) if cache_dir else None
+    df    = cache.forecast(cfg) if cache else build_forecast(cfg)
+    files = [os.path.join(out_dir, f"{name}.forecast.{fmt}")]
+    _write(compact_forecast(df, dtypes), files[-1], fmt, cfg, "forecast")
+    if yearly:
+        files.append(os.path.join(out_dir, f"{name}.yearly.{fmt}"))
+        _write(build_yearly_projection(df, cfg), files[-1], fmt, cfg, "yearly")
+    frames = build_scenarios(cfg, cache=cache) if scenarios else {}
+    if scenarios:
+        overrides = scenario_overrides(cfg)
+        for label, sdf in frames.items():
+            files.append(os.path.join(out_dir,
+                                      f"{name}.scenario_{label.lower()}.{fmt}"))
+            _write(compact_forecast(sdf, dtypes), files[-1], fmt,
+                   dataclasses.replace(cfg, **overrides[label]),
+                   "scenario", {"scenario": label})
+    if excel:
+        from .workbook import write_workbook
+        files.append(os.path.join(out_dir, f"{name}.xlsx"))
+        write_workbook(files[-1], cfg, df, scenarios=frames or None)
+    return {
+        "name":       name,
+        "rows":       len(df),
+        "revenue":    float(df["total_revenue_monthly"].sum()),
+        "net_profit": float(df["net_profit_monthly"].sum()),
+        "files":      files,
+        "ms":         (time.perf_counter() - t0) * 1e3,
+    }
+
+
+def _run_job_args(args: Tuple) -> Dict:
+    return run_job(*args)
+
+
+def run_batch(jobs: List[Tuple[str, BachatConfig]], out_dir: str,
+              fmt: str = "parquet", workers: int = 1, scenarios: bool = False,
+              yearly: bool = False, cache_dir: Optional[str] = None,
+              dtypes: str = "default", excel: bool = False) -> List[Dict]:
+    """Run every (name, cfg) job, in a process pool when workers > 1."""
+    os.makedirs(out_dir, exist_ok=True)
+    args = [(name, cfg, out_dir, fmt, scenarios, yearly, cache_dir, dtypes, excel)
+            for name, cfg in jobs]
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+            return list(pool.map(_run_job_args, args))
+    return [_run_job_args(a) for a in args]
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def _parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="bachat",
+        description="Run Bachat forecasts headlessly from JSON / YAML configs.")
+    p.add_argument("configs", nargs="+", metavar="CONFIG",
+                   help="JSON or YAML config file(s)")
+    p.add_argument("-o", "--out", default="bachat_out",
+                   help="output directory (default: bachat_out)")
+    p.add_argument("-f", "--format", choices=FORMATS, default="parquet",
+                   help="forecast file format (default: parquet)")
+    p.add_argument("-j", "--workers", type=int, default=1,
+                   help="worker processes (default: 1)")
+    p.add_argument("--scenarios", action="store_true",
+                   help="also write Base / Optimistic / Pessimistic forecasts")
+    p.add_argument("--yearly", action="store_true",
+                   help="also write the yearly projection")
+    p.add_argument("--cache-dir", default=None,
+                   help="reuse / store forecasts in this on-disk cache "
+                        "(invalidated automatically when the engine changes)")
+    p.add_argument("--dtypes", choices=FORECAST_DTYPES, default="default",
+                   help="column types of written forecasts: compact = small "
+                        "ints (lossless), float32 = also float32 metrics")
+    p.add_argument("--excel", action="store_true",
+                   help="also write a multi-sheet .xlsx workbook per config "
+                        "(includes the scenarios with --scenarios)")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+
+    jobs: List[Tuple[str, BachatConfig]] = []
+    for path in args.configs:
+        try:
+            jobs.extend(load_configs(path))
+        except (OSError, ValueError, TypeError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+
+    names = [name for name, _ in jobs]
+    dupes = sorted({n for n in names if names.count(n) > 1})
+    if dupes:
+        print(f"error: duplicate config name(s): {', '.join(dupes)}",
+              file=sys.stderr)
+        return 2
+
+    valid, failed = [], 0
+    for name, cfg in jobs:
+        errors, warnings = validate_config(cfg)
+        for w in warnings:
+            print(f"warning [{name}]: {w}", file=sys.stderr)
+        for e in errors:
+            print(f"error [{name}]: {e}", file=sys.stderr)
+        if errors:
+            failed += 1
+        else:
+            valid.append((name, cfg))
+
+    results = run_batch(valid, args.out, args.format, args.workers,
+                        args.scenarios, args.yearly, args.cache_dir,
+                        args.dtypes, args.excel)
+    for r in results:
+        print(f"{r['name']:<24} {r['rows']:>7,} rows  "
+              f"revenue {r['revenue']:>18,.0f}  "
+              f"net {r['net_profit']:>18,.0f}  {r['ms']:>8.1f} ms")
+    print(f"{len(results)} config(s) written to {args.out}"
+          + (f", {failed} skipped with errors" if failed else ""))
+    return 1 if failed else 0
@@ -0,0 +1,1946 @@
+"""
+BACHAT KOMMITTEE — pricing & risk engine.
+
+Pure model code shared by the Streamlit app and the headless CLI: config,
+validation, cycle economics, lifecycle, forecast tensor, scenarios, yearly
+projection, Monte Carlo defaults and the result cache.  Nothing here imports
+streamlit or plotly.
+"""
+
+import copy
+import dataclasses
+import functools
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .trace import span, traced
+
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+@dataclass
+class BachatConfig:
+    """Single source of truth for all model inputs (v3.0)."""
+    # ── User growth ────────────────────────────────────────────────────────────
+    starting_users: int        = 100_000
+    monthly_growth_rate: float = 8.0
+    churn_rate: float          = 5.0
+    returning_user_rate: float = 60.0
+    rest_period_months: int    = 1
+    simulation_months: int     = 48
+    # Max cycles a user may start per simulation year: {duration: cap}.
+    # Durations without an entry are uncapped.
+    participation_caps: Dict   = field(default_factory=dict)
+
+    # ── Portfolio ──────────────────────────────────────────────────────────────
+    durations: List[int]       = field(default_factory=lambda: [4, 6])
+    slab_amounts: List[int]    = field(default_factory=lambda: [5_000, 10_000])
+    slot_fee_pct: float        = 5.0          # default fee; overridden by slot_fees_config
+    # Per-duration blocked slots: {duration: n_blocked}.  Falls back to min(1, N-1).
+    blocked_slots_config: Dict = field(default_factory=dict)
+    fee_collection_mode: str   = "Upfront"    # "Upfront" | "Monthly"
+
+    # Per-slot fee overrides: key = "{duration}_{slot}", value = fee_pct (float)
+    slot_fees_config: Dict     = field(default_factory=lambda: {
+        "4_3": 8.0, "4_4": 0.0,
+        "6_4": 8.0, "6_5": 7.0, "6_6": 0.0,
+    })
+
+    # ── Interest / NII ─────────────────────────────────────────────────────────
+    kibor_rate: float          = 10.5
+    spread: float              = 0.0
+    collection_day: int        = 1
+    disbursement_day: int      = 15
+
+    # ── Default risk ───────────────────────────────────────────────────────────
+    default_rate: float        = 8.0
+    recovery_rate: float       = 70.0
+    penalty_pct: float         = 10.0
+    default_pre_pct: float     = 30.0   # % of defaults occurring BEFORE payout
+    default_post_pct: float    = 70.0   # % of defaults occurring AFTER payout
+
+    # ── Profit split ───────────────────────────────────────────────────────────
+    profit_split_party_a: float = 90.0
+
+    # ── Market / TAM ───────────────────────────────────────────────────────────
+    use_tam: bool              = False
+    duration_share: Dict       = field(default_factory=dict)  # {duration: share_pct}
+    slab_share: Dict           = field(default_factory=dict)  # {slab: share_pct}
+    market_size: int           = 18_000_000
+    sam_size: int              = 1_800_000
+    som_size: int              = 1_000_000
+    market_growth_rate: float  = 15.0
+
+    # ── YoY projection ─────────────────────────────────────────────────────────
+    yoy_growth_rate: float     = 10.0
+
+
+# Dict fields keyed by duration / slab.  JSON and YAML hand their keys back as
+# strings, so config_from_dict restores the ints the engine looks up by.
+_INT_KEYED_FIELDS = ("blocked_slots_config", "duration_share", "slab_share",
+                     "participation_caps")
+
+
+def config_from_dict(data: Dict) -> BachatConfig:
+    """Build a BachatConfig from a plain mapping (e.g. parsed JSON / YAML).
+    Missing fields keep their defaults; unknown fields raise ValueError."""
+    known   = {f.name for f in dataclasses.fields(BachatConfig)}
+    unknown = sorted(set(data) - known)
+    if unknown:
+        raise ValueError(f"Unknown BachatConfig field(s): {', '.join(unknown)}")
+    kwargs = dict(data)
+    for name in _INT_KEYED_FIELDS:
+        if name in kwargs and kwargs[name] is not None:
+            kwargs[name] = {int(k): v for k, v in kwargs[name].items()}
+    return BachatConfig(**kwargs)
+
+
+def config_to_dict(cfg: BachatConfig) -> Dict:
+    """Inverse of config_from_dict — plain dict of every field."""
+    return dataclasses.asdict(cfg)
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _blocked(cfg: "BachatConfig", duration: int) -> int:
+    """Blocked slots for a specific duration.
+    Defaults to min(1, duration-1) if not explicitly configured."""
+    return cfg.blocked_slots_config.get(duration, min(1, duration - 1))
+
+
+# =============================================================================
+# VALIDATION
+# =============================================================================
+
+def validate_config(cfg: BachatConfig) -> Tuple[List[str], List[str]]:
+    """Return (errors, warnings). Errors block computation; warnings are advisory."""
+    errors: List[str]   = []
+    warnings: List[str] = []
+
+    if not cfg.durations:
+        errors.append("Select at least one KOMMITTEE duration.")
+    if not cfg.slab_amounts:
+        errors.append("Select at least one slab amount.")
+    for d in cfg.durations:
+        b = _blocked(cfg, d)
+        if b >= d:
+            errors.append(
+                f"Blocked slots for {d}M ({b}) must be < {d}. No user slots would remain."
+            )
+    for d in cfg.durations:
+        cap = cfg.participation_caps.get(d)
+        if cap is not None and (cap < 1 or int(cap) != cap):
+            errors.append(
+                f"Participation cap for {d}M ({cap}) must be a whole number of "
+                f"cycles per year, at least 1."
+            )
+    if cfg.collection_day >= cfg.disbursement_day:
+        errors.append(
+            f"Collection day ({cfg.collection_day}) must be < disbursement day "
+            f"({cfg.disbursement_day}) for positive base NII."
+        )
+    pre_post_sum = cfg.default_pre_pct + cfg.default_post_pct
+    if abs(pre_post_sum - 100.0) > 0.5:
+        errors.append(
+            f"Pre-payout ({cfg.default_pre_pct:.1f}%) + post-payout "
+            f"({cfg.default_post_pct:.1f}%) must sum to 100% (currently {pre_post_sum:.1f}%)."
+        )
+    if cfg.use_tam:
+        d_sum = sum(cfg.duration_share.get(d, 0.0) for d in cfg.durations)
+        if abs(d_sum - 100.0) > 0.5:
+            errors.append(
+                f"Duration shares sum to {d_sum:.1f}% — must equal 100%."
+            )
+        s_sum = sum(cfg.slab_share.get(s, 0.0) for s in cfg.slab_amounts)
+        if abs(s_sum - 100.0) > 0.5:
+            errors.append(
+                f"Slab shares sum to {s_sum:.1f}% — must equal 100%."
+            )
+        if cfg.som_size > cfg.sam_size:
+            warnings.append("SOM > SAM — SOM cannot exceed addressable market.")
+        if cfg.sam_size > cfg.market_size:
+            warnings.append("SAM > TAM — SAM cannot exceed total market.")
+
+    net_loss_rate = cfg.default_rate * (1 - cfg.recovery_rate / 100)
+    if net_loss_rate > 20:
+        warnings.append(
+            f"Net expected loss rate is {net_loss_rate:.1f}% — extremely high. "
+            "Verify default and recovery assumptions."
+        )
+    if cfg.kibor_rate + cfg.spread <= 0:
+        warnings.append("Effective NII rate is ≤ 0% — no interest income will accrue.")
+    if cfg.monthly_growth_rate > 20:
+        warnings.append(
+            f"Monthly growth rate {cfg.monthly_growth_rate:.1f}% implies "
+            f"{cfg.monthly_growth_rate*12:.0f}%+ annual growth — verify this is realistic."
+        )
+
+    return errors, warnings
+
+
+# =============================================================================
+# ENGINE  —  pure functions, no Streamlit
+# =============================================================================
+
+def held_days(deposit_month: int, payout_month: int,
+              deposit_day: int, payout_day: int) -> int:
+    """30/360 day-count — standard for KIBOR-linked contracts."""
+    return max(0, (payout_month - deposit_month) * 30 + (payout_day - deposit_day))
+
+
+def nii(principal: float, annual_rate_pct: float, days: int) -> float:
+    if principal <= 0 or days <= 0:
+        return 0.0
+    return principal * (annual_rate_pct / 100.0) * (days / 365.0)
+
+
+def max_debtor_position(duration: int, slot: int, slab: float) -> float:
+    return max(0.0, (duration - slot) * slab)
+
+
+def slot_conditional_default_loss(
+    duration: int, blocked: int, slab: float,
+    default_rate_pct: float, recovery_rate_pct: float
+) -> Tuple[float, float]:
+    """Returns (gross_loss, net_loss). User slots only (blocked+1..N)."""
+    p = default_rate_pct  / 100.0
+    r = recovery_rate_pct / 100.0
+    gross = sum(max_debtor_position(duration, s, slab) * p
+                for s in range(blocked + 1, duration + 1))
+    return gross, gross * (1.0 - r)
+
+
+def platform_float_capital(duration: int, blocked: int, slab: float) -> float:
+    total = 0.0
+    for k in range(1, blocked + 1):
+        r = duration - k
+        total += slab * r * (r + 1) / 2.0
+    return total
+
+
+def base_nii_per_cycle(duration: int, slab: float, annual_rate_pct: float,
+                       collection_day: int, disbursement_day: int) -> float:
+    """NII on full monthly pool between collection and disbursement.
+    30/360 convention. Principal = N × M (full pot, all members)."""
+    if disbursement_day <= collection_day:
+        return 0.0
+    return duration * nii(duration * slab, annual_rate_pct,
+                          disbursement_day - collection_day)
+
+
+def float_nii_per_cycle(duration: int, blocked: int, slab: float,
+                        annual_rate_pct: float) -> float:
+    """NII on platform working-capital float from blocked slots.
+    Different principal from base_nii — no double-counting."""
+    return platform_float_capital(duration, blocked, slab) * (annual_rate_pct / 100.0) / 12.0
+
+
+def cycle_fees_and_fee_nii(
+    cfg: BachatConfig, duration: int, slab: float, annual_rate_pct: float
+) -> Tuple[float, float]:
+    """Compute total fees and fee-NII for one cycle, respecting:
+      - per-slot fee overrides in cfg.slot_fees_config
+      - fee_collection_mode ("Upfront" vs "Monthly")
+
+    Upfront:  fee = pot × fee_pct%;  NII hold = half-cycle (N×30/2 days)
+    Monthly:  fee = slab × N × fee_pct%;  NII hold = quarter-cycle (N×30/4 days)
+    Note: fee amount is identical in both modes; timing differs → different NII.
+    """
+    N   = duration
+    pot = N * slab
+    blocked    = _blocked(cfg, N)
+    total_fees = 0.0
+    for s in range(blocked + 1, N + 1):
+        key     = f"{N}_{s}"
+        fee_pct = cfg.slot_fees_config.get(key, cfg.slot_fee_pct)
+        # Both modes charge fee_pct on the full pot (numerically equivalent)
+        total_fees += pot * (fee_pct / 100.0)
+
+    if cfg.fee_collection_mode == "Upfront":
+        hold_days_val = int(N * 30 / 2)   # collected at start, held ~half cycle
+    else:
+        hold_days_val = int(N * 30 / 4)   # collected monthly, avg ~quarter cycle
+
+    f_nii = nii(total_fees, annual_rate_pct, hold_days_val)
+    return total_fees, f_nii
+
+
+def cycle_default_loss_split(
+    cfg: BachatConfig, duration: int, slab: float
+) -> Dict:
+    """Default loss split into pre-payout and post-payout portions.
+
+    Pre-payout defaults: member stops paying before receiving the pot.
+      → Operational loss, immediately affects cash flow.
+    Post-payout defaults: member receives pot then stops paying.
+      → Credit loss, affects receivables provisioning.
+    """
+    blocked    = _blocked(cfg, duration)
+    gross, net = slot_conditional_default_loss(
+        duration, blocked, slab, cfg.default_rate, cfg.recovery_rate)
+    penalty  = gross * (cfg.penalty_pct / 100.0)
+    pre_net  = net * (cfg.default_pre_pct  / 100.0)
+    post_net = net * (cfg.default_post_pct / 100.0)
+    return {
+        "gross": gross, "net": net,
+        "pre_net": pre_net, "post_net": post_net,
+        "penalty": penalty,
+    }
+
+
+LIFECYCLE_COLUMNS: List[str] = [
+    "new_users", "returning_users", "active_users_in_cycle",
+    "resting_users", "completed_users", "churned_users",
+]
+
+
+def _lagged_feedback(x: np.ndarray, lag: int, churn: float,
+                     ret_rate: float) -> np.ndarray:
+    """Solve y[i] = survivors(x[i-lag] + y[i-lag]) · ret_rate along the last axis,
+    where survivors(f) = f - f·churn (y = 0 for i < lag; all zero if lag < 1).
+
+    This is the IIR filter lfilter(b=[0]*lag + [k], a=[1] + [0]*(lag-1) + [-k], x)
+    with k = (1-churn)·ret_rate. Every output in a block of `lag` months depends
+    only on the previous block, so it is stepped a whole block at a time —
+    ceil(M / lag) vector operations. The churn / survivor arithmetic mirrors
+    the cohort loop exactly, so integer-truncated counts are unchanged.
+    """
+    y = np.zeros_like(x)
+    M = x.shape[-1]
+    if lag < 1:
+        return y
+    for lo in range(lag, M, lag):
+        hi        = min(lo + lag, M)
+        finishing = x[..., lo - lag:hi - lag] + y[..., lo - lag:hi - lag]
+        churned   = finishing * churn
+        y[..., lo:hi] = (finishing - churned) * ret_rate
+    return y
+
+
+def _capped_feedback(x: np.ndarray, lag: int, churn: float, ret_rate: float,
+                     cap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """_lagged_feedback with at most `cap` cycle starts per user per simulation
+    year (months 1-12, 13-24, ...).  Returns (returning, clipped).
+
+    Flows are tracked by how many cycles their users have started this year:
+    r[k] holds returners starting their (k+1)-th, and new users count as a
+    first start.  A return inside the same year moves the cohort up one count,
+    and survivors already at `cap` are clipped (they drop out of the return
+    flow); a return into a new year resets the count to one.  The state is a
+    compact (cap, ..., M) array stepped a `lag`-month block at a time as in
+    _lagged_feedback, so caps add no per-user or per-cohort loop.
+    """
+    r       = np.zeros((cap,) + x.shape)
+    clipped = np.zeros_like(x)
+    M       = x.shape[-1]
+    if lag < 1:
+        return r.sum(axis=0), clipped
+    year = np.arange(M) // 12
+    for lo in range(lag, M, lag):
+        hi        = min(lo + lag, M)
+        finishing = r[..., lo - lag:hi - lag].copy()
+        finishing[0] += x[..., lo - lag:hi - lag]
+        churned   = finishing * churn
+        survivors = (finishing - churned) * ret_rate
+        same_year = year[lo:hi] == year[lo - lag:hi - lag]
+        r[0, ..., lo:hi]    = np.where(same_year, 0.0, survivors.sum(axis=0))
+        r[1:, ..., lo:hi]   = np.where(same_year, survivors[:-1], 0.0)
+        clipped[..., lo:hi] = np.where(same_year, survivors[-1], 0.0)
+    return r.sum(axis=0), clipped
+
+
+def _lifecycle_arrays(cfg: BachatConfig, duration: int,
+                      starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Batched, vectorized lifecycle core: one row per starting-user count.
+
+    Returns float arrays shaped (len(starts), M) keyed by LIFECYCLE_COLUMNS
+    (plus capped_users when the duration has a participation cap), before
+    integer truncation. Rows are independent, so callers can batch
+    every TAM scale factor of a duration into a single pass.
+
+      new_users:       geometric growth via a sequential multiply.accumulate
+      returning_users: lagged feedback filter, lag = duration - 1 + rest
+                       (a cohort starting in month m finishes in m + N - 1
+                       and survivors return rest months later). With rest = 0
+                       the return lands in the finishing month, whose
+                       returning count is already fixed, so — as in the
+                       original cohort loop — nobody returns.
+      capped_users:    returners clipped by the duration's participation cap
+                       (_capped_feedback); a cap the lag can never reach
+                       (cap ≥ ceil(12 / lag)) takes the uncapped path.
+                       Only materialised for capped durations.
+      completed/churned/resting: the finishing cohort, N - 1 months back
+      active_users:    N-month window as one difference of the cumsum
+    """
+    M        = cfg.simulation_months
+    N        = duration
+    g        = cfg.monthly_growth_rate / 100.0
+    churn    = cfg.churn_rate          / 100.0
+    ret_rate = cfg.returning_user_rate / 100.0
+    rest     = cfg.rest_period_months
+    starts   = np.asarray(starts, dtype=float).reshape(-1, 1)
+    B        = starts.shape[0]
+
+    growth = np.full((B, M), 1.0 + g)
+    growth[:, :1] = starts
+    cumulative = np.multiply.accumulate(growth, axis=1)
+    new_users  = np.maximum(0.0, cumulative - cumulative / (1.0 + g))
+    new_users[:, :1] = starts
+
+    lag = N - 1 + rest if rest >= 1 else 0
+    cap = cfg.participation_caps.get(N)
+    capped_users = None
+    if cap is not None and lag >= 1 and cap < -(-12 // lag):
+        returning_users, capped_users = _capped_feedback(
+            new_users, lag, churn, ret_rate, int(cap))
+    else:
+        returning_users = _lagged_feedback(new_users, lag, churn, ret_rate)
+        if cap is not None:
+            capped_users = np.zeros((B, M))
+
+    completed_users = np.zeros((B, M))
+    completed_users[:, N - 1:] = (new_users + returning_users)[:, :max(0, M - N + 1)]
+    churned_users = completed_users * churn
+    resting_users = completed_users - churned_users
+
+    cs     = np.concatenate([np.zeros((B, 1)),
+                             np.cumsum(new_users + returning_users, axis=1)], axis=1)
+    months = np.arange(1, M + 1)
+    active = cs[:, months] - cs[:, np.maximum(0, months - N)]
+
+    out = {
+        "new_users":             new_users,
+        "returning_users":       returning_users,
+        "active_users_in_cycle": active,
+        "resting_users":         resting_users,
+        "completed_users":       completed_users,
+        "churned_users":         churned_users,
+    }
+    if capped_users is not None:
+        out["capped_users"] = capped_users
+    return out
+
+
+def user_lifecycle(cfg: BachatConfig, duration: int,
+                   scale_factor: float = 1.0) -> pd.DataFrame:
+    """Cohort-tracked lifecycle (vectorized, see _lifecycle_arrays).
+    Pass 1: project new_users growth (geometric).
+    Pass 2: returning users as a lagged feedback filter — each finishing cohort
+            (new + returning) feeds the return N - 1 + rest months later, so
+            second-generation churn and multi-cycle returns are correct.
+    Pass 3: O(M) active-users via np.cumsum sliding window.
+    cfg.participation_caps[duration], when set, limits cycles started per user
+    per year; returners over the cap are clipped into a trailing capped_users
+    column (present only for a capped duration).
+
+    scale_factor: applied to starting_users for TAM distribution.
+    """
+    start = float(cfg.starting_users) * scale_factor
+    arrays = _lifecycle_arrays(cfg, duration, np.array([start]))
+    out = {"month": np.arange(1, cfg.simulation_months + 1)}
+    out.update({col: arr[0].astype(int) for col, arr in arrays.items()})
+    return pd.DataFrame(out)
+
+
+def _tam_scale(cfg: BachatConfig, duration: int, slab: int) -> float:
+    """Scale factor for this duration×slab combination under TAM distribution.
+    Returns 1.0 if use_tam is False."""
+    if not cfg.use_tam:
+        return 1.0
+    n = len(cfg.durations) * len(cfg.slab_amounts)
+    d_pct = cfg.duration_share.get(duration, 100.0 / max(1, len(cfg.durations)))
+    s_pct = cfg.slab_share.get(slab,     100.0 / max(1, len(cfg.slab_amounts)))
+    return (d_pct / 100.0) * (s_pct / 100.0)
+
+
+FORECAST_COLUMNS: List[str] = [
+    "month", "year", "duration", "slab_amount",
+    "new_users", "returning_users", "active_users", "churned_users",
+    "groups_started_monthly", "groups_running_monthly",
+    "pot_disbursed_monthly", "user_contributions_monthly",
+    "platform_capital_monthly", "float_outstanding_monthly",
+    "base_nii_monthly", "float_nii_monthly", "fee_nii_monthly",
+    "fees_monthly", "penalty_income_monthly",
+    "pre_payout_loss_monthly", "post_payout_loss_monthly",
+    "default_loss_monthly", "total_revenue_monthly",
+    "net_profit_monthly", "party_a_monthly", "party_b_monthly",
+]
+
+
+_KEY_COLUMNS   = ("month", "year", "duration", "slab_amount")
+_USER_COLUMNS  = ("new_users", "returning_users", "active_users", "churned_users")
+
+# Output dtype modes for forecast frames.
+#   "default"  int64 keys / user counts, float64 metrics.
+#   "compact"  int16 month / year / duration, int32 slab_amount and user counts,
+#              float64 metrics — lossless, ~18% smaller. An integer column whose
+#              values don't fit its compact type stays int64.
+#   "float32"  compact integers plus float32 metrics, ~53% smaller. Each value is
+#              rounded to float32 (relative error <= FLOAT32_RTOL, about PKR 600
+#              on a PKR 10bn month); sums taken in float32 stay within a few
+#              multiples of it (~1e-7 on the portfolio aggregates).
+FORECAST_DTYPES = ("default", "compact", "float32")
+FLOAT32_RTOL    = 2.0 ** -24
+_COMPACT_KEYS   = {"month": np.int16, "year": np.int16,
+                   "duration": np.int16, "slab_amount": np.int32}
+
+
+def _check_dtypes(dtypes: str) -> None:
+    if dtypes not in FORECAST_DTYPES:
+        raise ValueError(f"Unknown dtypes mode '{dtypes}'. "
+                         f"Use one of {', '.join(FORECAST_DTYPES)}.")
+
+
+def _cast_columns(cols: Dict[str, np.ndarray], dtypes: str) -> Dict[str, np.ndarray]:
+    """Apply a FORECAST_DTYPES mode to forecast columns."""
+    _check_dtypes(dtypes)
+    if dtypes == "default":
+        return cols
+    out = {}
+    for c, a in cols.items():
+        if c in _COMPACT_KEYS or c in _USER_COLUMNS:
+            info   = np.iinfo(_COMPACT_KEYS.get(c, np.int32))
+            fits   = not a.size or (a.min() >= info.min and a.max() <= info.max)
+            out[c] = a.astype(info.dtype, copy=False) if fits else a
+        elif dtypes == "float32" and a.dtype.kind == "f":
+            out[c] = a.astype(np.float32, copy=False)
+        else:
+            out[c] = a
+    return out
+
+
+def compact_forecast(df: pd.DataFrame, dtypes: str = "compact") -> pd.DataFrame:
+    """Re-type a build_forecast frame to a FORECAST_DTYPES mode (see above)."""
+    cols = _cast_columns({c: df[c].to_numpy() for c in df.columns}, dtypes)
+    return pd.DataFrame(cols, columns=df.columns, index=df.index)
+
+
+_CYCLE_CONSTANTS = (
+    "pot", "user_capital", "platform_capital", "avg_float",
+    "base_nii", "float_nii", "fee_nii", "fees", "penalty",
+    "pre_net", "post_net", "net",
+)
+
+
+@dataclass
+class ForecastTensor:
+    """Whole-portfolio forecast held as arrays shaped (durations, slabs, months).
+
+    `metrics` maps every non-key FORECAST_COLUMNS name to a (D, S, M) array.
+    The long-format DataFrame is only materialised by `to_frame()`; portfolio
+    KPIs are reductions over the duration/slab axes.
+    """
+    durations: np.ndarray
+    slabs: np.ndarray
+    months: np.ndarray
+    metrics: Dict[str, np.ndarray]
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return len(self.durations), len(self.slabs), len(self.months)
+
+    @property
+    def years(self) -> np.ndarray:
+        return (self.months - 1) // 12 + 1
+
+    @traced(name="ForecastTensor.to_frame")
+    def to_frame(self, dtypes: str = "default") -> pd.DataFrame:
+        """Long format, one row per duration × slab × month (build_forecast layout).
+        `dtypes` picks a FORECAST_DTYPES mode; columns are cast before the
+        frame is assembled, so compact frames never hold a wide copy."""
+        D, S, M = self.shape
+        cols = {
+            "month":       np.tile(self.months, D * S),
+            "year":        np.tile(self.years, D * S),
+            "duration":    np.repeat(self.durations, S * M),
+            "slab_amount": np.tile(np.repeat(self.slabs, M), D),
+        }
+        cols.update({c: self.metrics[c].reshape(-1)
+                     for c in FORECAST_COLUMNS if c not in _KEY_COLUMNS})
+        return pd.DataFrame(_cast_columns(cols, dtypes), columns=FORECAST_COLUMNS)
+
+    def monthly(self) -> pd.DataFrame:
+        """Portfolio totals per month — same layout as _agg_monthly(df)."""
+        cols = {"month": self.months}
+        cols.update({c: self.metrics[c].sum(axis=(0, 1))
+                     for c in FORECAST_COLUMNS if c not in _KEY_COLUMNS})
+        return pd.DataFrame(cols)
+
+    def yearly(self) -> pd.DataFrame:
+        """Portfolio totals per simulated year (sums of the monthly totals)."""
+        years, first = np.unique(self.years, return_index=True)
+        cols = {"year": years}
+        cols.update({c: np.add.reduceat(self.metrics[c].sum(axis=(0, 1)), first)
+                     for c in FORECAST_COLUMNS if c not in _KEY_COLUMNS})
+        return pd.DataFrame(cols)
+
+
+def _tensor_scales(cfg: BachatConfig) -> np.ndarray:
+    """TAM scale factor per (duration, slab), shape (D, S)."""
+    return np.array([[_tam_scale(cfg, d, s) for s in cfg.slab_amounts]
+                     for d in cfg.durations], dtype=float).reshape(
+                         len(cfg.durations), len(cfg.slab_amounts))
+
+
+def _tensor_lifecycle(cfg: BachatConfig) -> Dict[str, np.ndarray]:
+    """Integer-truncated lifecycle columns shaped (D, S, M).
+    The lifecycle runs once per duration over the distinct scale factors of
+    its slabs (a single pass when TAM distribution is off)."""
+    D, S, M = len(cfg.durations), len(cfg.slab_amounts), cfg.simulation_months
+    scales  = _tensor_scales(cfg)
+    out     = {c: np.zeros((D, S, M), dtype=int) for c in LIFECYCLE_COLUMNS}
+    for i, duration in enumerate(cfg.durations):
+        uniq, inverse = np.unique(scales[i], return_inverse=True)
+        arrays = _lifecycle_arrays(cfg, duration,
+                                   float(cfg.starting_users) * uniq)
+        for c in LIFECYCLE_COLUMNS:
+            out[c][i] = arrays[c].astype(int)[inverse]
+    return out
+
+
+def _tensor_cycle_constants(cfg: BachatConfig) -> Dict[str, np.ndarray]:
+    """Per-cycle economics for every (duration, slab), each shaped (D, S)."""
+    annual_rate = cfg.kibor_rate + cfg.spread
+    D, S = len(cfg.durations), len(cfg.slab_amounts)
+    out  = {c: np.zeros((D, S)) for c in _CYCLE_CONSTANTS}
+    for i, N in enumerate(cfg.durations):
+        blocked = _blocked(cfg, N)
+        for j, slab in enumerate(cfg.slab_amounts):
+            fees, fee_nii = cycle_fees_and_fee_nii(cfg, N, slab, annual_rate)
+            def_split     = cycle_default_loss_split(cfg, N, slab)
+            float_pkr     = platform_float_capital(N, blocked, slab)
+            out["pot"][i, j]              = N * slab
+            out["user_capital"][i, j]     = (N - blocked) * slab
+            out["platform_capital"][i, j] = blocked * slab
+            out["avg_float"][i, j]        = float_pkr / N if N > 0 else 0.0
+            out["base_nii"][i, j]         = base_nii_per_cycle(
+                N, slab, annual_rate, cfg.collection_day, cfg.disbursement_day)
+            out["float_nii"][i, j]        = float_nii_per_cycle(
+                N, blocked, slab, annual_rate)
+            out["fees"][i, j]             = fees
+            out["fee_nii"][i, j]          = fee_nii
+            out["penalty"][i, j]          = def_split["penalty"]
+            out["pre_net"][i, j]          = def_split["pre_net"]
+            out["post_net"][i, j]         = def_split["post_net"]
+            out["net"][i, j]              = def_split["net"]
+    return out
+
+
+def _tensor_groups(cfg: BachatConfig,
+                   lifecycle: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(groups_started, groups_running), each (D, S, M).
+    Running groups are an N-month sliding window over the cumsum of starts."""
+    M       = cfg.simulation_months
+    N       = np.asarray(cfg.durations, dtype=int).reshape(-1, 1, 1)
+    started = (lifecycle["new_users"] + lifecycle["returning_users"]) / N
+    cs      = np.concatenate([np.zeros(started.shape[:2] + (1,)),
+                              np.cumsum(started, axis=2)], axis=2)
+    months  = np.arange(1, M + 1)
+    lo      = np.broadcast_to(np.maximum(0, months - N), started.shape)
+    running = cs[..., 1:] - np.take_along_axis(cs, lo, axis=2)
+    return started, running
+
+
+# Monthly column → (per-cycle constant, basis). Basis "running" multiplies by
+# groups running; "k" by groups running / N (the cycle amortised over N months).
+_SCALED_METRICS: Dict[str, Tuple[str, str]] = {
+    "pot_disbursed_monthly":      ("pot",              "running"),
+    "user_contributions_monthly": ("user_capital",     "running"),
+    "platform_capital_monthly":   ("platform_capital", "running"),
+    "float_outstanding_monthly":  ("avg_float",        "running"),
+    "base_nii_monthly":           ("base_nii",  "k"),
+    "float_nii_monthly":          ("float_nii", "k"),
+    "fee_nii_monthly":            ("fee_nii",   "k"),
+    "fees_monthly":               ("fees",      "k"),
+    "penalty_income_monthly":     ("penalty",   "k"),
+    "pre_payout_loss_monthly":    ("pre_net",   "k"),
+    "post_payout_loss_monthly":   ("post_net",  "k"),
+    "default_loss_monthly":       ("net",       "k"),
+}
+_REVENUE_METRICS = ("base_nii_monthly", "float_nii_monthly", "fee_nii_monthly",
+                    "fees_monthly", "penalty_income_monthly")
+
+
+def _tensor_user_metrics(lifecycle: Dict[str, np.ndarray],
+                         started: np.ndarray, gr: np.ndarray) -> Dict[str, np.ndarray]:
+    """User and group columns (D, S, M) — depend on the lifecycle only."""
+    return {
+        "new_users":       lifecycle["new_users"],
+        "returning_users": lifecycle["returning_users"],
+        "active_users":    lifecycle["active_users_in_cycle"],
+        "churned_users":   lifecycle["churned_users"],
+        "groups_started_monthly": started,
+        "groups_running_monthly": gr,
+    }
+
+
+def _tensor_scaled_metrics(cfg: BachatConfig, eco: Dict[str, np.ndarray],
+                           gr: np.ndarray,
+                           columns=None) -> Dict[str, np.ndarray]:
+    """Scale per-cycle constants by running groups → monthly columns (D, S, M).
+    `columns` restricts the output to a subset of _SCALED_METRICS."""
+    N     = np.asarray(cfg.durations, dtype=float).reshape(-1, 1, 1)
+    basis = {"running": gr, "k": gr / N}
+    return {col: eco[const][..., None] * basis[b]
+            for col, (const, b) in _SCALED_METRICS.items()
+            if columns is None or col in columns}
+
+
+def _tensor_totals(metrics: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Total revenue and net profit (D, S, M) from the component columns."""
+    m_rev = metrics[_REVENUE_METRICS[0]]
+    for col in _REVENUE_METRICS[1:]:
+        m_rev = m_rev + metrics[col]
+    return {"total_revenue_monthly": m_rev,
+            "net_profit_monthly":    m_rev - metrics["default_loss_monthly"]}
+
+
+def _tensor_split(cfg: BachatConfig,
+                  metrics: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Party A / Party B profit columns (D, S, M)."""
+    profit = metrics["net_profit_monthly"]
+    m_a    = profit * (cfg.profit_split_party_a / 100.0)
+    return {"party_a_monthly": m_a, "party_b_monthly": profit - m_a}
+
+
+def _make_tensor(cfg: BachatConfig, metrics: Dict[str, np.ndarray]) -> ForecastTensor:
+    return ForecastTensor(
+        durations=np.asarray(cfg.durations, dtype=int),
+        slabs=np.asarray(cfg.slab_amounts, dtype=int),
+        months=np.arange(1, cfg.simulation_months + 1),
+        metrics=metrics,
+    )
+
+
+@traced
+def build_forecast_tensor(cfg: BachatConfig) -> ForecastTensor:
+    """Whole-portfolio forecast as (durations, slabs, months) arrays."""
+    lifecycle   = _tensor_lifecycle(cfg)
+    eco         = _tensor_cycle_constants(cfg)
+    started, gr = _tensor_groups(cfg, lifecycle)
+    metrics     = _tensor_user_metrics(lifecycle, started, gr)
+    metrics.update(_tensor_scaled_metrics(cfg, eco, gr))
+    metrics.update(_tensor_totals(metrics))
+    metrics.update(_tensor_split(cfg, metrics))
+    return _make_tensor(cfg, metrics)
+
+
+# -----------------------------------------------------------------------------
+# Incremental recomputation
+# -----------------------------------------------------------------------------
+
+# Config fields each stage reads. Fields in no stage (market sizing, YoY
+# projection) never invalidate the forecast.
+STAGE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "lifecycle": ("durations", "slab_amounts", "simulation_months",
+                  "starting_users", "monthly_growth_rate", "churn_rate",
+                  "returning_user_rate", "rest_period_months",
+                  "participation_caps", "use_tam", "duration_share", "slab_share"),
+    "economics": ("durations", "slab_amounts", "slot_fee_pct",
+                  "blocked_slots_config", "fee_collection_mode",
+                  "slot_fees_config", "kibor_rate", "spread",
+                  "collection_day", "disbursement_day",
+                  "default_rate", "recovery_rate", "penalty_pct",
+                  "default_pre_pct", "default_post_pct"),
+    "scaling":   (),
+    "split":     ("profit_split_party_a",),
+}
+# Stage → stages whose output it consumes.
+STAGE_UPSTREAM: Dict[str, Tuple[str, ...]] = {
+    "lifecycle": (),
+    "economics": (),
+    "scaling":   ("lifecycle", "economics"),
+    "split":     ("scaling",),
+}
+STAGE_ORDER: Tuple[str, ...] = ("lifecycle", "economics", "scaling", "split")
+
+
+class IncrementalForecaster:
+    """Forecast engine that keeps every stage's output between calls and
+    recomputes only what a config change invalidates.
+
+    A changed field dirties the stages listed for it in STAGE_FIELDS. The
+    economics stage then reports which per-cycle constants actually moved, so
+    scaling only rebuilds the monthly columns fed by those constants (a KIBOR
+    change rebuilds the three NII columns, the totals and the split; a
+    profit-split change rebuilds the party columns only). `last_report`
+    records what was recomputed and reused on the most recent update.
+    """
+
+    def __init__(self):
+        self._cfg: Optional[BachatConfig] = None
+        self._lifecycle: Dict[str, np.ndarray] = {}
+        self._eco: Dict[str, np.ndarray] = {}
+        self._groups: Tuple[np.ndarray, np.ndarray] = (np.empty(0), np.empty(0))
+        self._metrics: Dict[str, np.ndarray] = {}
+        self.last_report: Dict[str, List[str]] = {}
+
+    def changed_fields(self, cfg: BachatConfig) -> List[str]:
+        names = [f.name for f in dataclasses.fields(cfg)]
+        if self._cfg is None:
+            return names
+        return [n for n in names if getattr(cfg, n) != getattr(self._cfg, n)]
+
+    def dirty_stages(self, cfg: BachatConfig) -> List[str]:
+        """Stages invalidated by `cfg`, including downstream propagation."""
+        changed = set(self.changed_fields(cfg))
+        dirty: List[str] = []
+        for stage in STAGE_ORDER:
+            if (changed & set(STAGE_FIELDS[stage])
+                    or any(up in dirty for up in STAGE_UPSTREAM[stage])):
+                dirty.append(stage)
+        return dirty
+
+    @traced(name="IncrementalForecaster.update")
+    def update(self, cfg: BachatConfig) -> ForecastTensor:
+        changed  = set(self.changed_fields(cfg))
+        dirty    = set(self.dirty_stages(cfg))
+        rebuilt: List[str] = []
+        columns: List[str] = []
+
+        if "lifecycle" in dirty:
+            with span("engine.lifecycle"):
+                self._lifecycle = _tensor_lifecycle(cfg)
+                self._groups    = _tensor_groups(cfg, self._lifecycle)
+                user_metrics    = _tensor_user_metrics(self._lifecycle,
+                                                       *self._groups)
+            self._metrics.update(user_metrics)
+            columns.extend(user_metrics)
+            rebuilt.append("lifecycle")
+
+        moved = set()
+        if "economics" in dirty:
+            with span("engine.economics"):
+                eco = _tensor_cycle_constants(cfg)
+            moved = {c for c in eco
+                     if c not in self._eco or self._eco[c].shape != eco[c].shape
+                     or not np.array_equal(self._eco[c], eco[c])}
+            self._eco = eco
+            rebuilt.append("economics")
+
+        if "lifecycle" in dirty:
+            scaled = list(_SCALED_METRICS)
+        else:
+            scaled = [col for col, (const, _) in _SCALED_METRICS.items()
+                      if const in moved]
+        totals = [col for col in scaled
+                  if col in _REVENUE_METRICS or col == "default_loss_monthly"]
+        if scaled:
+            with span("engine.scaling"):
+                self._metrics.update(_tensor_scaled_metrics(
+                    cfg, self._eco, self._groups[1], scaled))
+                if totals:
+                    self._metrics.update(_tensor_totals(self._metrics))
+            columns.extend(scaled)
+            if totals:
+                columns.extend(["total_revenue_monthly", "net_profit_monthly"])
+            rebuilt.append("scaling")
+
+        if totals or changed & set(STAGE_FIELDS["split"]):
+            with span("engine.split"):
+                self._metrics.update(_tensor_split(cfg, self._metrics))
+            columns.extend(["party_a_monthly", "party_b_monthly"])
+            rebuilt.append("split")
+
+        self._cfg = copy.deepcopy(cfg)
+        self.last_report = {
+            "recomputed": rebuilt,
+            "reused":     [stage for stage in STAGE_ORDER if stage not in rebuilt],
+            "columns":    columns,
+        }
+        return _make_tensor(cfg, dict(self._metrics))
+
+
+@traced
+def build_forecast(cfg: BachatConfig, dtypes: str = "default") -> pd.DataFrame:
+    """Monthly forecast across all durations × slab_amounts.
+    Long-format view of build_forecast_tensor (one row per combo × month).
+    All revenue columns are _monthly; `dtypes` is a FORECAST_DTYPES mode."""
+    return build_forecast_tensor(cfg).to_frame(dtypes)
+
+
+def cycle_economics(cfg: BachatConfig, duration: int, slab: int = 0) -> Dict:
+    """Per-cycle economics summary for a single duration × slab."""
+    if slab == 0:
+        slab = cfg.slab_amounts[0] if cfg.slab_amounts else 10_000
+    annual_rate = cfg.kibor_rate + cfg.spread
+    N           = duration
+    pot         = N * slab
+
+    blocked     = _blocked(cfg, N)
+    b_nii       = base_nii_per_cycle(N, slab, annual_rate,
+                                     cfg.collection_day, cfg.disbursement_day)
+    fl_nii      = float_nii_per_cycle(N, blocked, slab, annual_rate)
+    fees, f_nii = cycle_fees_and_fee_nii(cfg, N, slab, annual_rate)
+    def_split   = cycle_default_loss_split(cfg, N, slab)
+    net_def     = def_split["net"]
+    penalty     = def_split["penalty"]
+    total_rev   = b_nii + fl_nii + fees + f_nii + penalty
+    fpm         = platform_float_capital(N, blocked, slab)
+
+    return {
+        "duration": N, "slab": slab, "pot": pot,
+        "user_slots": N - blocked,
+        "base_nii": b_nii, "float_nii": fl_nii,
+        "fees": fees, "fee_nii": f_nii,
+        "gross_default": def_split["gross"],
+        "net_default": net_def,
+        "pre_payout_loss": def_split["pre_net"],
+        "post_payout_loss": def_split["post_net"],
+        "penalty_income": penalty,
+        "total_revenue": total_rev,
+        "net_profit": total_rev - net_def,
+        "float_pkr_months": fpm,
+        "avg_float_outstanding": fpm / N if N > 0 else 0.0,
+        "blocked_slots": blocked,
+        "max_single_default_loss": max(
+            (max_debtor_position(N, s, slab)
+             for s in range(blocked + 1, N + 1)),
+            default=0.0),
+    }
+
+
+def _tetrahedral(n: np.ndarray) -> np.ndarray:
+    """Σ_{r=1..n} r(r+1)/2."""
+    return n * (n + 1) * (n + 2) / 6.0
+
+
+def _slot_fee_pct_sum(cfg: BachatConfig, duration: np.ndarray,
+                      blocked: np.ndarray) -> np.ndarray:
+    """Σ fee % over user slots (blocked+1..N), honouring slot_fees_config.
+    Evaluated once per distinct (duration, blocked) pair."""
+    pairs, inverse = np.unique(np.stack([duration.ravel(), blocked.ravel()], axis=1),
+                               axis=0, return_inverse=True)
+    sums = np.array([
+        sum(cfg.slot_fees_config.get(f"{n}_{s}", cfg.slot_fee_pct)
+            for s in range(b + 1, n + 1))
+        for n, b in pairs.tolist()
+    ], dtype=float)
+    return sums[inverse.ravel()].reshape(duration.shape)
+
+
+@traced
+def cycle_economics_batch(cfg: BachatConfig, duration=None, slab=None,
+                          blocked=None, default_rate=None, recovery_rate=None,
+                          slot_fee_pct=None, kibor_rate=None,
+                          spread=None) -> Dict[str, np.ndarray]:
+    """Vectorized cycle_economics over broadcastable arrays of inputs.
+
+    Every argument left as None takes its value from cfg (duration and slab
+    default to the first configured ones, blocked to _blocked per duration).
+    When slot_fee_pct is given it is charged uniformly on every user slot and
+    slot_fees_config overrides are ignored — the convention of the fee
+    sensitivity sweep. Returns the cycle_economics keys as arrays shaped like
+    the broadcast inputs. Per-slot sums are closed forms:
+      Σ max_debtor_position = slab · (N-b-1)(N-b)/2
+      platform_float_capital = slab · (T(N-1) - T(N-b-1)),  T(n) = n(n+1)(n+2)/6
+    """
+    if duration is None:
+        duration = cfg.durations[0] if cfg.durations else 3
+    if slab is None:
+        slab = cfg.slab_amounts[0] if cfg.slab_amounts else 10_000
+    N, slab = np.broadcast_arrays(np.asarray(duration, dtype=int),
+                                  np.asarray(slab, dtype=float))
+    if blocked is None:
+        blocked = np.vectorize(lambda d: _blocked(cfg, int(d)), otypes=[int])(N)
+    p   = np.asarray(cfg.default_rate  if default_rate  is None else default_rate,  dtype=float)
+    r   = np.asarray(cfg.recovery_rate if recovery_rate is None else recovery_rate, dtype=float)
+    kib = np.asarray(cfg.kibor_rate    if kibor_rate    is None else kibor_rate,    dtype=float)
+    spr = np.asarray(cfg.spread        if spread        is None else spread,        dtype=float)
+    fee = np.asarray(np.nan if slot_fee_pct is None else slot_fee_pct, dtype=float)
+    N, slab, b, p, r, kib, spr, fee = np.broadcast_arrays(
+        N, slab, np.asarray(blocked, dtype=int), p, r, kib, spr, fee)
+    annual     = kib + spr
+    pot        = N * slab
+    user_slots = np.maximum(N - b, 0)
+
+    # ── Revenue ──────────────────────────────────────────────────────────────
+    days   = cfg.disbursement_day - cfg.collection_day
+    b_nii  = np.where((days > 0) & (pot > 0),
+                      N * (pot * (annual / 100.0) * (days / 365.0)), 0.0)
+    fpm    = np.where(b > 0, slab * (_tetrahedral(N - 1) - _tetrahedral(N - b - 1)), 0.0)
+    fl_nii = fpm * (annual / 100.0) / 12.0
+
+    if slot_fee_pct is None:
+        fee_sum = _slot_fee_pct_sum(cfg, N, b)
+    else:
+        fee_sum = fee * user_slots
+    fees  = pot * (fee_sum / 100.0)
+    hold  = np.floor(N * 30 / (2 if cfg.fee_collection_mode == "Upfront" else 4))
+    f_nii = np.where((fees > 0) & (hold > 0),
+                     fees * (annual / 100.0) * (hold / 365.0), 0.0)
+
+    # ── Defaults ─────────────────────────────────────────────────────────────
+    gross   = slab * (user_slots - 1) * user_slots / 2.0 * (p / 100.0)
+    gross   = np.where(user_slots > 0, gross, 0.0)
+    net_def = gross * (1.0 - r / 100.0)
+    penalty = gross * (cfg.penalty_pct / 100.0)
+
+    total_rev = b_nii + fl_nii + fees + f_nii + penalty
+    return {
+        "duration": N, "slab": slab, "pot": pot,
+        "user_slots": user_slots,
+        "base_nii": b_nii, "float_nii": fl_nii,
+        "fees": fees, "fee_nii": f_nii,
+        "gross_default": gross,
+        "net_default": net_def,
+        "pre_payout_loss": net_def * (cfg.default_pre_pct / 100.0),
+        "post_payout_loss": net_def * (cfg.default_post_pct / 100.0),
+        "penalty_income": penalty,
+        "total_revenue": total_rev,
+        "net_profit": total_rev - net_def,
+        "float_pkr_months": fpm,
+        "avg_float_outstanding": np.where(N > 0, fpm / np.maximum(N, 1), 0.0),
+        "blocked_slots": b,
+        "max_single_default_loss": np.where(
+            user_slots > 0, np.maximum(0, user_slots - 1) * slab, 0.0),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Breakeven solver
+# -----------------------------------------------------------------------------
+
+# Parameters the solver accepts (cycle_economics_batch keywords) and the
+# domain a breakeven must fall in to be reported.
+BREAKEVEN_DOMAINS: Dict[str, Tuple[float, float]] = {
+    "default_rate":  (0.0, 100.0),
+    "recovery_rate": (0.0, 100.0),
+    "slot_fee_pct":  (0.0, 100.0),
+    "kibor_rate":    (-50.0, 100.0),
+    "spread":        (-100.0, 100.0),
+}
+
+
+def _bisect_zero(fn: Callable[[np.ndarray], np.ndarray], lo: np.ndarray,
+                 hi: np.ndarray, iters: int = 80) -> np.ndarray:
+    """Vectorized bisection for fn(x) = 0 on [lo, hi]; NaN where fn does not
+    change sign over the bracket."""
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    f_lo   = fn(lo)
+    ok     = np.sign(f_lo) != np.sign(fn(hi))
+    for _ in range(iters):
+        mid   = (lo + hi) / 2.0
+        f_mid = fn(mid)
+        left  = np.sign(f_mid) == np.sign(f_lo)
+        lo    = np.where(left, mid, lo)
+        f_lo  = np.where(left, f_mid, f_lo)
+        hi    = np.where(left, hi, mid)
+    return np.where(ok, (lo + hi) / 2.0, np.nan)
+
+
+def solve_breakeven(cfg: BachatConfig, param: str, duration=None,
+                    slab=None) -> np.ndarray:
+    """Value of `param` at which net profit per cycle is exactly zero.
+
+    Net profit is affine in every parameter of BREAKEVEN_DOMAINS (NII, fees
+    and losses are all linear in them), so two kernel evaluations fix the
+    line and the root is closed form. Roots that fail a residual check
+    (e.g. the fee-NII kink at zero fees) or fall outside the domain are
+    re-solved by bisection over the domain; NaN means no breakeven there.
+    duration / slab broadcast like cycle_economics_batch, so a whole
+    portfolio grid is solved in one call. slot_fee_pct is a uniform fee on
+    every user slot.
+    """
+    if param not in BREAKEVEN_DOMAINS:
+        raise ValueError(f"No breakeven solver for {param!r}; "
+                         f"choose from {', '.join(BREAKEVEN_DOMAINS)}.")
+    lo, hi = BREAKEVEN_DOMAINS[param]
+
+    def profit(x):
+        return cycle_economics_batch(cfg, duration, slab, **{param: x})["net_profit"]
+
+    p0, p1 = profit(0.0), profit(1.0)
+    slope  = p1 - p0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.where(slope != 0, -p0 / slope, np.nan)
+    scale = np.maximum(np.abs(p0), np.abs(p1)) + 1.0
+    exact = (np.isfinite(root) & (root >= lo) & (root <= hi)
+             & (np.abs(profit(np.where(np.isfinite(root), root, 0.0))) <= 1e-9 * scale))
+    if exact.all():
+        return root
+    return np.where(exact, root, _bisect_zero(profit, np.full_like(root, lo),
+                                              np.full_like(root, hi)))
+
+
+@traced
+def breakeven_table(cfg: BachatConfig,
+                    params: Tuple[str, ...] = tuple(BREAKEVEN_DOMAINS)) -> pd.DataFrame:
+    """Breakeven of each parameter for every configured duration × slab."""
+    dur_grid, slab_grid = np.meshgrid(cfg.durations, cfg.slab_amounts, indexing="ij")
+    out = {"duration": dur_grid.ravel(), "slab": slab_grid.ravel()}
+    for param in params:
+        out[param] = solve_breakeven(cfg, param, dur_grid, slab_grid).ravel()
+    return pd.DataFrame(out)
+
+
+@traced
+def build_slot_table(cfg: BachatConfig, duration: int, slab: int = 0) -> pd.DataFrame:
+    if slab == 0:
+        slab = cfg.slab_amounts[0] if cfg.slab_amounts else 10_000
+    N       = duration
+    blocked = _blocked(cfg, N)
+    rows    = []
+    for slot in range(1, N + 1):
+        is_plat  = slot <= blocked
+        max_d    = 0.0 if is_plat else max_debtor_position(N, slot, slab)
+        exp_loss = (0.0 if is_plat else
+                    max_d * (cfg.default_rate / 100.0) * (1 - cfg.recovery_rate / 100.0))
+        key      = f"{N}_{slot}"
+        fee_pct  = cfg.slot_fees_config.get(key, cfg.slot_fee_pct) if not is_plat else 0.0
+        rows.append({
+            "Slot":                        slot,
+            "Holder":                      "PLATFORM" if is_plat else "USER",
+            "Receives Pot (PKR)":          N * slab,
+            "Paid Before Receiving (PKR)": (slot - 1) * slab,
+            "Max Debtor Position (PKR)":   max_d,
+            "Expected Loss (PKR)":         exp_loss,
+            "Fee %":                       fee_pct,
+            "Fee (PKR)":                   N * slab * (fee_pct / 100.0),
+            "Status":                      ("Platform-held (safe)" if is_plat else
+                                            ("User: SAFE (last slot)" if slot == N
+                                             else "User: AT RISK")),
+        })
+    return pd.DataFrame(rows)
+
+
+def scenario_overrides(cfg: BachatConfig) -> Dict[str, Dict]:
+    """Standard Base / Optimistic / Pessimistic field overrides for cfg."""
+    return {
+        "Base": {},
+        "Optimistic": dict(
+            default_rate  = cfg.default_rate  * 0.50,
+            monthly_growth_rate = cfg.monthly_growth_rate * 1.25,
+            recovery_rate = min(100.0, cfg.recovery_rate * 1.20),
+        ),
+        "Pessimistic": dict(
+            default_rate  = cfg.default_rate  * 2.00,
+            monthly_growth_rate = cfg.monthly_growth_rate * 0.60,
+            recovery_rate = cfg.recovery_rate * 0.70,
+        ),
+    }
+
+
+def _timed_forecast(cfg: BachatConfig,
+                    dtypes: str = "default") -> Tuple[pd.DataFrame, float]:
+    t0 = time.perf_counter()
+    df = build_forecast(cfg, dtypes)
+    return df, time.perf_counter() - t0
+
+
+@traced
+def run_scenarios(cfg: BachatConfig, overrides: Dict[str, Dict],
+                  max_workers: Optional[int] = None, use_processes: bool = False,
+                  cache: Optional["ForecastCache"] = None, dtypes: str = "default"
+                  ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, float]]:
+    """Run one forecast per named override dict on a worker pool.
+
+    overrides: {scenario name: {BachatConfig field: value}}, applied to cfg
+    with dataclasses.replace. Returns ({name: forecast}, {name: seconds}) in
+    the order given. Threads are the default (NumPy releases the GIL in the
+    heavy kernels and a ForecastCache can be shared); use_processes=True
+    runs each scenario in its own process and bypasses the cache.
+    `dtypes` (a FORECAST_DTYPES mode) applies to uncached runs; a cache
+    returns frames in its own mode.
+    """
+    fields = {f.name for f in dataclasses.fields(cfg)}
+    for name, changes in overrides.items():
+        unknown = set(changes) - fields
+        if unknown:
+            raise ValueError(f"Scenario {name!r} overrides unknown field(s): "
+                             f"{', '.join(sorted(unknown))}.")
+    configs = {name: dataclasses.replace(cfg, **changes)
+               for name, changes in overrides.items()}
+    if not configs:
+        return {}, {}
+    _check_dtypes(dtypes)
+
+    if use_processes:
+        pool, task = ProcessPoolExecutor, functools.partial(_timed_forecast,
+                                                            dtypes=dtypes)
+    else:
+        pool = ThreadPoolExecutor
+        def task(c: BachatConfig) -> Tuple[pd.DataFrame, float]:
+            if cache is None:
+                return _timed_forecast(c, dtypes)
+            t0 = time.perf_counter()
+            return cache.forecast(c), time.perf_counter() - t0
+
+    workers = max_workers or min(len(configs), os.cpu_count() or 1)
+    with pool(max_workers=workers) as ex:
+        futures = {name: ex.submit(task, c) for name, c in configs.items()}
+        results = {name: fut.result() for name, fut in futures.items()}
+    return ({name: r[0] for name, r in results.items()},
+            {name: r[1] for name, r in results.items()})
+
+
+def build_scenarios(cfg: BachatConfig, cache: Optional["ForecastCache"] = None,
+                    dtypes: str = "default") -> Dict[str, pd.DataFrame]:
+    """Build Base / Optimistic / Pessimistic scenario forecasts.
+    With a ForecastCache, each scenario config is looked up / stored individually."""
+    frames, _ = run_scenarios(cfg, scenario_overrides(cfg), cache=cache,
+                              dtypes=dtypes)
+    return frames
+
+
+@traced
+def build_yearly_projection(df: pd.DataFrame, cfg: BachatConfig,
+                             extra_years: int = 3,
+                             aggs: Optional["ForecastAggregates"] = None) -> pd.DataFrame:
+    """Actual simulated years + YoY-extrapolated extra years.
+    With precomputed ForecastAggregates the forecast is not regrouped."""
+    if aggs is not None:
+        yearly = pd.DataFrame({
+            "year":    aggs.yearly["year"],
+            "revenue": aggs.yearly["total_revenue_monthly"],
+            "profit":  aggs.yearly["net_profit_monthly"],
+            "loss":    aggs.yearly["default_loss_monthly"],
+            "fees":    aggs.yearly["fees_monthly"],
+            "users":   aggs.yearly_peak["active_users"],
+        })
+    else:
+        yearly = (df.groupby("year")
+                    .agg(revenue=("total_revenue_monthly", "sum"),
+                         profit =("net_profit_monthly",    "sum"),
+                         loss   =("default_loss_monthly",  "sum"),
+                         fees   =("fees_monthly",           "sum"),
+                         users  =("active_users",           "max"))
+                    .reset_index())
+    yearly["source"] = "Simulated"
+
+    last_year = int(yearly["year"].max())
+    last_row  = yearly.iloc[-1]
+    g = cfg.yoy_growth_rate / 100.0
+    ext_rows = []
+    for i in range(1, extra_years + 1):
+        ext_rows.append({
+            "year":    last_year + i,
+            "revenue": last_row["revenue"] * (1 + g) ** i,
+            "profit":  last_row["profit"]  * (1 + g) ** i,
+            "loss":    last_row["loss"]    * (1 + g) ** i,
+            "fees":    last_row["fees"]    * (1 + g) ** i,
+            "users":   int(last_row["users"] * (1 + g) ** i),
+            "source":  "Projected",
+        })
+    return pd.concat([yearly, pd.DataFrame(ext_rows)], ignore_index=True)
+
+
+# =============================================================================
+# MONTE CARLO DEFAULTS  —  loss distributions over the slot structure
+# =============================================================================
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal CDF (Numerical Recipes erfc, fractional error < 1.2e-7)."""
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (
+        0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (
+            1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _cohort_default_loss(rng: np.random.Generator, counts: np.ndarray,
+                         exposures: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """Σ exposure × defaults over one duration's cohorts, for every cell of p.
+
+    Row l of `counts` / `exposures` (levels × months) is one slot × slab
+    level: how many members hold it and what each one's default costs.
+    Members default independently with probability p (cells × months). Once
+    the cohort's Σn·p·(1-p) ≥ 50 the per-level counts are normal to within
+    sampling noise, and a weighted sum of independent normals is itself
+    normal — so those cells draw a single variate with mean Σe·np and
+    variance Σe²·np(1-p). Smaller cohorts draw an exact binomial per level.
+    """
+    members = counts.sum(axis=0)
+    e1      = (counts * exposures).sum(axis=0)
+    e2      = (counts * exposures ** 2).sum(axis=0)
+    var     = members * p * (1.0 - p)
+    big     = var >= 50.0
+    if big.all():
+        loss = e1 * p + np.sqrt(e2 * var / members) * rng.standard_normal(p.shape)
+        return np.clip(loss, 0.0, e1)
+    loss    = np.zeros(p.shape)
+    if big.any():
+        cols = np.nonzero(big)[1]
+        pb, vb = p[big], var[big] / members[cols]
+        loss[big] = np.clip(e1[cols] * pb
+                            + np.sqrt(e2[cols] * vb) * rng.standard_normal(len(pb)),
+                            0.0, e1[cols])
+    small = ~big
+    if small.any():
+        cols, ps = np.nonzero(small)[1], p[small]
+        acc = np.zeros(len(ps))
+        for n, e in zip(counts, exposures):
+            if n[cols].any():
+                acc += e[cols] * rng.binomial(n[cols], ps)
+        loss[small] = acc
+    return loss
+
+
+@dataclass
+class LossSimulation:
+    """Monte Carlo net default-loss paths for the whole portfolio.
+
+    `paths` is (n_paths, M): simulated default_loss_monthly summed over every
+    duration × slab. `expected` is the deterministic build_forecast column for
+    comparison. VaR / expected shortfall are over the horizon total unless a
+    per-month frame is requested with to_frame().
+    """
+    months: np.ndarray
+    paths: np.ndarray
+    expected: np.ndarray
+    pre_share: float
+    post_share: float
+
+    def totals(self) -> np.ndarray:
+        return self.paths.sum(axis=1)
+
+    def var(self, level: float = 0.99) -> float:
+        return float(np.quantile(self.totals(), level))
+
+    def expected_shortfall(self, level: float = 0.99) -> float:
+        totals = self.totals()
+        return float(totals[totals >= np.quantile(totals, level)].mean())
+
+    def to_frame(self, levels: Tuple[float, ...] = (0.95, 0.99)) -> pd.DataFrame:
+        """Per-month mean / VaR / ES of the loss columns of build_forecast."""
+        mean = self.paths.mean(axis=0)
+        out  = {
+            "month":                         self.months,
+            "default_loss_expected":         self.expected,
+            "default_loss_mean":             mean,
+            "pre_payout_loss_mean":          mean * self.pre_share,
+            "post_payout_loss_mean":         mean * self.post_share,
+        }
+        for level in levels:
+            tag  = f"{level * 100:g}"
+            var  = np.quantile(self.paths, level, axis=0)
+            tail = self.paths >= var
+            out[f"default_loss_var_{tag}"] = var
+            out[f"default_loss_es_{tag}"]  = (
+                (self.paths * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1))
+        return pd.DataFrame(out)
+
+    def summary(self, levels: Tuple[float, ...] = (0.95, 0.99)) -> Dict[str, float]:
+        totals = self.totals()
+        out = {"expected": float(self.expected.sum()), "mean": float(totals.mean()),
+               "std": float(totals.std())}
+        for level in levels:
+            out[f"var_{level * 100:g}"] = self.var(level)
+            out[f"es_{level * 100:g}"]  = self.expected_shortfall(level)
+        return out
+
+
+@traced
+def simulate_default_losses(cfg: BachatConfig, n_paths: int = 10_000,
+                            seed: Optional[int] = None, correlation: float = 0.0,
+                            chunk_size: int = 2_000,
+                            tensor: Optional[ForecastTensor] = None) -> LossSimulation:
+    """Monte Carlo counterpart of slot_conditional_default_loss.
+
+    Every monthly cohort of groups (groups_started_monthly) defaults member
+    by member in each user slot with non-zero exposure; a default costs
+    max_debtor_position × (1 - recovery). The slots and slabs of one duration
+    share a cycle calendar, so their cohort loss is drawn together per
+    (path, cohort month) — see _cohort_default_loss. A cohort's
+    loss is spread evenly over its N cycle months — the same amortisation as
+    default_loss_monthly, whose value is the mean of the simulated paths.
+
+    correlation ρ ∈ [0, 1) couples defaults through a one-factor Gaussian
+    copula: each (path, cohort month) draws a systemic Z and members default
+    with probability Φ((Φ⁻¹(p) − √ρ·Z) / √(1 − ρ)). Fractional cohorts draw
+    ceil(n) members and are scaled back, preserving the mean. Paths are
+    processed in chunks of `chunk_size` to bound memory; results are
+    reproducible for a given seed and chunk_size.
+    """
+    if not 0.0 <= correlation < 1.0:
+        raise ValueError("correlation must be in [0, 1).")
+    tensor  = tensor if tensor is not None else build_forecast_tensor(cfg)
+    started = tensor.metrics["groups_started_monthly"]
+    M       = len(tensor.months)
+    p       = cfg.default_rate / 100.0
+    lgd     = 1.0 - cfg.recovery_rate / 100.0
+    paths   = np.zeros((n_paths, M))
+    result  = LossSimulation(
+        months=tensor.months, paths=paths,
+        expected=tensor.metrics["default_loss_monthly"].sum(axis=(0, 1)),
+        pre_share=cfg.default_pre_pct / 100.0,
+        post_share=cfg.default_post_pct / 100.0)
+
+    combos = []
+    for i, N in enumerate(cfg.durations):
+        blocked = _blocked(cfg, N)
+        counts, exposures = [], []
+        for j, slab in enumerate(cfg.slab_amounts):
+            expo = np.array([max_debtor_position(N, s, slab)
+                             for s in range(blocked + 1, N + 1)])
+            expo = expo[expo > 0] * lgd
+            if len(expo) == 0 or lgd == 0:
+                continue
+            members = np.ceil(started[i, j])
+            weight  = np.divide(started[i, j], members,
+                                out=np.zeros(M), where=members > 0)
+            for e in expo:
+                counts.append(members.astype(np.int64))
+                exposures.append(e * weight)
+        if counts and np.any(counts):
+            combos.append((N, np.array(counts), np.array(exposures)))
+    if p <= 0.0 or not combos:
+        return result
+
+    rng       = np.random.default_rng(seed)
+    threshold = NormalDist().inv_cdf(p) if p < 1.0 else np.inf
+    for start in range(0, n_paths, chunk_size):
+        C = min(chunk_size, n_paths - start)
+        if correlation > 0.0 and p < 1.0:
+            z  = rng.standard_normal((C, M))
+            pz = _norm_cdf((threshold - math.sqrt(correlation) * z)
+                           / math.sqrt(1.0 - correlation))
+        else:
+            pz = np.full((C, M), min(p, 1.0))
+        block = paths[start:start + C]
+        for N, counts, exposures in combos:
+            cs = np.cumsum(_cohort_default_loss(rng, counts, exposures, pz),
+                           axis=1)
+            cs /= N
+            block += cs
+            if N < M:
+                block[:, N:] -= cs[:, :M - N]
+    return result
+
+
+# =============================================================================
+# RESULT CACHE  —  config-hash keyed, LRU, no Streamlit
+# =============================================================================
+
+def _canonical(obj):
+    """JSON-safe canonical form: dict keys as sorted reprs (so {4: 2} and
+    {"4": 2} stay distinct), tuples as lists, integral floats as ints (so a
+    slider's 8.0 and a default 8 hash alike)."""
+    if isinstance(obj, dict):
+        return {repr(_canonical(k)): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, (bool, str)) or obj is None:
+        return obj
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        f = float(obj)
+        return int(f) if f.is_integer() else f
+    return str(obj)
+
+
+def config_hash(cfg: BachatConfig) -> str:
+    """Stable SHA-256 of every BachatConfig field, nested dicts included.
+    Other config dataclasses (the bachat.models generations) also hash their
+    type name, so one ForecastCache can hold every model's results."""
+    fields = _canonical(dataclasses.asdict(cfg))
+    if not isinstance(cfg, BachatConfig):
+        fields = {"model_config": type(cfg).__name__, "fields": fields}
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(cfg: BachatConfig, namespace: str = "") -> str:
+    """Cache key of cfg: config_hash, prefixed with `namespace` for results
+    that are not build_forecast frames (e.g. "model.v4", see bachat.models),
+    so one cache can hold both without handing back the wrong schema."""
+    digest = config_hash(cfg)
+    return f"{namespace}.{digest}" if namespace else digest
+
+
+class ForecastCache:
+    """Bounded LRU cache of build_forecast results keyed on config_hash.
+
+    Evicts least-recently-used entries once either `maxsize` entries or
+    `max_bytes` of DataFrame memory is exceeded (the newest entry is always
+    kept). Thread-safe, so one instance can be shared across Streamlit
+    sessions. Cached frames are shared — callers must treat them as read-only.
+    An optional second-level `store` (e.g. DiskForecastCache) is consulted on
+    a miss before anything is built. With `dtypes` other than "default",
+    build_forecast frames are compacted (see FORECAST_DTYPES) before they are
+    kept, so the same `max_bytes` holds correspondingly more forecasts;
+    namespaced results keep the dtypes their builder returned.
+    """
+
+    def __init__(self, maxsize: int = 32, max_bytes: int = 256 * 1024 ** 2,
+                 builder: Callable[[BachatConfig], pd.DataFrame] = build_forecast,
+                 store: Optional["DiskForecastCache"] = None,
+                 dtypes: str = "default"):
+        _check_dtypes(dtypes)
+        self.maxsize   = maxsize
+        self.max_bytes = max_bytes
+        self.builder   = builder
+        self.store     = store
+        self.dtypes    = dtypes
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._bytes    = 0
+        self._lock     = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, cfg: BachatConfig) -> bool:
+        return config_hash(cfg) in self._entries
+
+    def forecast(self, cfg: BachatConfig,
+                 builder: Optional[Callable[[BachatConfig], pd.DataFrame]] = None,
+                 namespace: str = "") -> pd.DataFrame:
+        """Cached build_forecast(cfg). `builder` overrides the cache's default
+        builder on a miss (e.g. a session's IncrementalForecaster); a builder
+        returning anything but a build_forecast frame needs its own
+        `namespace` (see cache_key)."""
+        key = cache_key(cfg, namespace)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        if self.store is not None:
+            df = self.store.forecast(cfg, builder or self.builder, namespace)
+        else:
+            df = (builder or self.builder)(cfg)
+        if self.dtypes != "default" and not namespace:
+            df = compact_forecast(df, self.dtypes)
+        self._store(key, df)
+        return df
+
+    def _store(self, key: str, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes    -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries), "bytes": self._bytes,
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Changes whenever the source of this module or of the earlier model
+# generations bachat.models caches (legacy.py, models.py) changes, so on-disk
+# results written by older code are never served.
+_VERSIONED_SOURCES = ("engine.py", "legacy.py", "models.py")
+_digest = hashlib.sha256()
+for _name in _VERSIONED_SOURCES:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), _name),
+              "rb") as _src:
+        _digest.update(_src.read())
+ENGINE_VERSION = _digest.hexdigest()[:16]
+
+
+class DiskForecastCache:
+    """Content-addressed on-disk cache of build_forecast results.
+
+    One file per forecast, named `<cache_key>-<ENGINE_VERSION>.<ext>`, as
+    Parquet (default) or Arrow IPC / Feather (`fmt="feather"`, faster to load).
+    A hit touches the file's mtime; once the directory exceeds `max_bytes` the
+    least-recently-used files are deleted (the newest is always kept). Files
+    from other engine versions are purged on open. Writes go through a temp
+    file + os.replace, so concurrent sessions / processes never see a partial
+    file; unreadable files are treated as a miss and removed.
+    """
+
+    FORMATS = {"parquet": ".parquet", "feather": ".arrow"}
+
+    def __init__(self, directory: str, max_bytes: int = 1024 ** 3,
+                 builder: Callable[[BachatConfig], pd.DataFrame] = build_forecast,
+                 fmt: str = "parquet", engine_version: str = ENGINE_VERSION):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown cache format '{fmt}'. "
+                             f"Use one of {', '.join(self.FORMATS)}.")
+        import pyarrow  # noqa: F401 — fail fast if the Arrow backend is missing
+        self.directory      = directory
+        self.max_bytes      = max_bytes
+        self.builder        = builder
+        self.fmt            = fmt
+        self.engine_version = engine_version
+        self.hits           = 0
+        self.misses         = 0
+        self.evictions      = 0
+        self._lock          = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.purge_stale()
+
+    def path(self, cfg: BachatConfig, namespace: str = "") -> str:
+        name = (f"{cache_key(cfg, namespace)}-{self.engine_version}"
+                f"{self.FORMATS[self.fmt]}")
+        return os.path.join(self.directory, name)
+
+    def __contains__(self, cfg: BachatConfig) -> bool:
+        return os.path.exists(self.path(cfg))
+
+    def _files(self) -> List[Tuple[str, os.stat_result]]:
+        out = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(tuple(self.FORMATS.values())):
+                try:
+                    out.append((entry.path, entry.stat()))
+                except FileNotFoundError:     # evicted by another process
+                    pass
+        return out
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def forecast(self, cfg: BachatConfig,
+                 builder: Optional[Callable[[BachatConfig], pd.DataFrame]] = None,
+                 namespace: str = "") -> pd.DataFrame:
+        """build_forecast(cfg) from disk if present, else built and written.
+        `namespace` as for ForecastCache.forecast."""
+        path = self.path(cfg, namespace)
+        df   = self._read(path)
+        with self._lock:
+            if df is not None:
+                self.hits += 1
+                return df
+            self.misses += 1
+        df = (builder or self.builder)(cfg)
+        self._write(path, df)
+        return df
+
+    def _read(self, path: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(path):
+            return None
+        try:
+            df = (pd.read_parquet(path) if self.fmt == "parquet"
+                  else pd.read_feather(path))
+            os.utime(path)
+            return df
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)            # truncated / corrupt: rebuild
+            return None
+
+    def _write(self, path: str, df: pd.DataFrame) -> None:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(tmp)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: str) -> None:
+        files = sorted(self._files(), key=lambda f: f[1].st_mtime)
+        total = sum(st.st_size for _, st in files)
+        for path, st in files:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= st.st_size
+            with self._lock:
+                self.evictions += 1
+
+    def purge_stale(self) -> int:
+        """Delete files written by other engine versions; returns the count."""
+        removed = 0
+        for path, _ in self._files():
+            stem = os.path.splitext(os.path.basename(path))[0]
+            if not stem.endswith(f"-{self.engine_version}"):
+                self._remove(path)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for path, _ in self._files():
+            self._remove(path)
+
+    def stats(self) -> Dict:
+        files   = self._files()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(files), "bytes": sum(st.st_size for _, st in files),
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# =============================================================================
+# AGGREGATION
+# =============================================================================
+
+@traced
+def _agg_monthly(df: pd.DataFrame) -> pd.DataFrame:
+    num_cols = [c for c in df.columns
+                if c not in ("month", "year", "duration", "slab_amount")]
+    return df.groupby("month")[num_cols].sum().reset_index()
+
+
+# Per-row stock columns: yearly views report their peak, not their sum.
+_PEAK_COLUMNS = ("active_users",)
+
+
+@dataclass
+class ForecastAggregates:
+    """Every aggregate the dashboard reads, built once per forecast.
+
+    monthly      portfolio sums per month (== _agg_monthly(df))
+    yearly       portfolio sums per year
+    yearly_peak  per-year max of the per-row stock columns (active_users)
+    by_duration  sums per (duration, month)
+    by_slab      sums per (slab_amount, month)
+    totals       whole-horizon sum of each metric column (column dtype kept)
+    cube         ForecastCube for ad-hoc roll-up / drill-down / slice, pivoted
+                 from `frame` on first access (only the pivot views use it)
+    """
+    monthly: pd.DataFrame
+    yearly: pd.DataFrame
+    yearly_peak: pd.DataFrame
+    by_duration: pd.DataFrame
+    by_slab: pd.DataFrame
+    totals: Dict[str, float]
+    frame: Optional[pd.DataFrame] = field(default=None, repr=False)
+    _cube: Optional["ForecastCube"] = field(default=None, init=False, repr=False)
+
+    @property
+    def cube(self) -> "ForecastCube":
+        if self._cube is None:
+            if self.frame is None:
+                raise ValueError("No forecast frame to build the cube from.")
+            self._cube = ForecastCube.from_frame(self.frame)
+        return self._cube
+
+
+@traced
+def build_aggregates(df: pd.DataFrame) -> ForecastAggregates:
+    """One pass of groupbys over the long forecast; tabs read from the result."""
+    num_cols = [c for c in df.columns
+                if c not in ("month", "year", "duration", "slab_amount")]
+    return ForecastAggregates(
+        monthly     = df.groupby("month")[num_cols].sum().reset_index(),
+        yearly      = df.groupby("year")[num_cols].sum().reset_index(),
+        yearly_peak = df.groupby("year")[list(_PEAK_COLUMNS)].max().reset_index(),
+        by_duration = df.groupby(["duration", "month"])[num_cols].sum().reset_index(),
+        by_slab     = df.groupby(["slab_amount", "month"])[num_cols].sum().reset_index(),
+        totals      = {c: df[c].sum() for c in num_cols},
+        frame       = df,
+    )
+
+
+# =============================================================================
+# OLAP CUBE  —  dense month × duration × slab × metric, marginals precomputed
+# =============================================================================
+
+CUBE_DIMS = ("month", "year", "duration", "slab")
+_CUBE_METRICS = tuple(c for c in FORECAST_COLUMNS if c not in _KEY_COLUMNS)
+
+
+class ForecastCube:
+    """Materialised forecast cube with every roll-up precomputed.
+
+    `data` is float64 shaped (months, durations, slabs, metrics).  On build the
+    cube sums it into every combination of {month | year | —} × {duration | —}
+    × {slab | —}, so a query is an index into the right marginal plus, at
+    most, a sum over the few axes kept only for filtering.
+
+        cube.rollup(("year", "duration"), ["net_profit_monthly"])
+        cube.drilldown(("year",), "slab", duration=6)
+        cube.slice(year=[1, 2], slab=10_000).rollup(("month",))
+        cube.value("fees_monthly", year=2, duration=4)
+
+    All measures roll up by sum — per-row stocks such as active_users are
+    summed over the portfolio like the monthly aggregate, not peaked.
+    """
+
+    def __init__(self, months: np.ndarray, durations: np.ndarray,
+                 slabs: np.ndarray, data: np.ndarray,
+                 metrics: Tuple[str, ...] = _CUBE_METRICS):
+        self.months    = np.asarray(months)
+        self.durations = np.asarray(durations)
+        self.slabs     = np.asarray(slabs)
+        self.metrics   = tuple(metrics)
+        self.data      = data
+        self.years     = (self.months - 1) // 12 + 1
+        self._year_ids, self._year_first = np.unique(self.years, return_index=True)
+        self._metric_index = {m: k for k, m in enumerate(self.metrics)}
+        self._marginals = self._build_marginals()
+
+    # ── Construction ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_tensor(cls, tensor: ForecastTensor) -> "ForecastCube":
+        data = np.stack([tensor.metrics[m].astype(float) for m in _CUBE_METRICS],
+                        axis=-1).transpose(2, 0, 1, 3)
+        return cls(tensor.months, tensor.durations, tensor.slabs,
+                   np.ascontiguousarray(data))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ForecastCube":
+        """Pivot a long build_forecast frame into a dense cube."""
+        months    = np.unique(df["month"].to_numpy())
+        durations = np.unique(df["duration"].to_numpy())
+        slabs     = np.unique(df["slab_amount"].to_numpy())
+        metrics   = tuple(m for m in _CUBE_METRICS if m in df.columns)
+        data = np.zeros((len(months), len(durations), len(slabs), len(metrics)))
+        idx  = (np.searchsorted(months,    df["month"].to_numpy()),
+                np.searchsorted(durations, df["duration"].to_numpy()),
+                np.searchsorted(slabs,     df["slab_amount"].to_numpy()))
+        data[idx] = df[list(metrics)].to_numpy(dtype=float)
+        return cls(months, durations, slabs, data, metrics)
+
+    def _build_marginals(self) -> Dict[Tuple[str, ...], np.ndarray]:
+        """Sums for every kept-dims combination, keyed in canonical order."""
+        out: Dict[Tuple[str, ...], np.ndarray] = {}
+        by_month = {("month", "duration", "slab"): self.data}
+        by_month[("month", "duration")] = self.data.sum(axis=2)
+        by_month[("month", "slab")]     = self.data.sum(axis=1)
+        by_month[("month",)]            = by_month[("month", "duration")].sum(axis=1)
+        for kept, arr in by_month.items():
+            rest = kept[1:]
+            out[kept]              = arr
+            out[("year",) + rest]  = np.add.reduceat(arr, self._year_first, axis=0)
+            out[rest]              = arr.sum(axis=0)
+        return out
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+    def _axis_coords(self, dim: str) -> np.ndarray:
+        return {"month": self.months, "year": self._year_ids,
+                "duration": self.durations, "slab": self.slabs}[dim]
+
+    def rollup(self, by=(), metrics: Optional[List[str]] = None,
+               **filters) -> pd.DataFrame:
+        """Aggregate to the `by` dims (any of CUBE_DIMS), optionally filtered.
+        Filter values may be a scalar or a list, e.g. duration=[4, 6]."""
+        by = (by,) if isinstance(by, str) else tuple(by)
+        for dim in by + tuple(filters):
+            if dim not in CUBE_DIMS:
+                raise ValueError(f"Unknown cube dimension '{dim}'. "
+                                 f"Use one of {', '.join(CUBE_DIMS)}.")
+        metrics = list(self.metrics) if metrics is None else list(metrics)
+        unknown = [m for m in metrics if m not in self._metric_index]
+        if unknown:
+            raise ValueError(f"Unknown cube metric(s): {', '.join(unknown)}")
+        used = set(by) | set(filters)
+
+        # Month resolution whenever month is grouped or filtered on; a year
+        # grouping is then re-derived from it.
+        time_dim = ("month" if "month" in used else
+                    "year" if "year" in used else None)
+        kept = ((time_dim,) if time_dim else ()) + tuple(
+            d for d in ("duration", "slab") if d in used)
+        arr = self._marginals[kept][..., [self._metric_index[m] for m in metrics]]
+
+        coords = {dim: self._axis_coords(dim) for dim in kept}
+        for axis, dim in enumerate(kept):
+            mask = np.ones(len(coords[dim]), dtype=bool)
+            for fdim in (("month", "year") if dim == "month" else (dim,)):
+                if fdim in filters:
+                    values = np.atleast_1d(filters[fdim])
+                    source = self.years if (dim == "month" and fdim == "year") \
+                        else coords[dim]
+                    mask &= np.isin(source, values)
+            if not mask.all():
+                arr = np.compress(mask, arr, axis=axis)
+                coords[dim] = coords[dim][mask]
+
+        if time_dim == "month" and "year" in by and "month" not in by:
+            years = (coords["month"] - 1) // 12 + 1
+            uniq, first = np.unique(years, return_index=True)
+            arr = (np.add.reduceat(arr, first, axis=0) if len(years)
+                   else arr[:0])
+            kept = ("year",) + kept[1:]
+            coords["year"] = uniq
+
+        drop = tuple(a for a, dim in enumerate(kept) if dim not in by)
+        if drop:
+            arr  = arr.sum(axis=drop)
+            kept = tuple(d for d in kept if d in by)
+        order = tuple(d for d in by if d in kept)       # rows nest in `by` order
+        arr   = arr.transpose([kept.index(d) for d in order] + [arr.ndim - 1])
+        kept  = order
+
+        index_cols = {}
+        if kept:
+            grids = np.meshgrid(*(coords[d] for d in kept), indexing="ij")
+            index_cols = {("slab_amount" if d == "slab" else d): g.reshape(-1)
+                          for d, g in zip(kept, grids)}
+        if "month" in by and "year" in by:
+            index_cols["year"] = (index_cols["month"] - 1) // 12 + 1
+        frame = pd.DataFrame(index_cols)
+        values = arr.reshape(-1, len(metrics))
+        for k, m in enumerate(metrics):
+            col = values[:, k]
+            frame[m] = col.astype(np.int64) if m in _USER_COLUMNS else col
+        columns = [("slab_amount" if d == "slab" else d) for d in by]
+        frame   = frame[columns + metrics]
+        if "month" in by and "year" in by:
+            # year is derived from month, so nest rows by `by` explicitly
+            frame = frame.sort_values(columns, kind="mergesort",
+                                      ignore_index=True)
+        return frame
+
+    def drilldown(self, by, dim: str, metrics: Optional[List[str]] = None,
+                  **filters) -> pd.DataFrame:
+        """One level finer than `by`: the same roll-up split by `dim`."""
+        by = (by,) if isinstance(by, str) else tuple(by)
+        return self.rollup(by + (dim,), metrics, **filters)
+
+    def slice(self, **filters) -> "ForecastCube":
+        """Sub-cube restricted to the filter values (year filters select months)."""
+        masks = {"month": np.ones(len(self.months), dtype=bool),
+                 "duration": np.ones(len(self.durations), dtype=bool),
+                 "slab": np.ones(len(self.slabs), dtype=bool)}
+        for dim, values in filters.items():
+            if dim not in CUBE_DIMS:
+                raise ValueError(f"Unknown cube dimension '{dim}'. "
+                                 f"Use one of {', '.join(CUBE_DIMS)}.")
+            values = np.atleast_1d(values)
+            if dim == "year":
+                masks["month"] &= np.isin(self.years, values)
+            else:
+                masks[dim] &= np.isin(self._axis_coords(dim), values)
+        data = self.data[np.ix_(masks["month"], masks["duration"], masks["slab"])]
+        return ForecastCube(self.months[masks["month"]],
+                            self.durations[masks["duration"]],
+                            self.slabs[masks["slab"]], data, self.metrics)
+
+    def value(self, metric: str, **filters) -> float:
+        """Grand total of one metric under the filters."""
+        return float(self.rollup((), [metric], **filters)[metric].iloc[0])
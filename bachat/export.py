@@ -0,0 +1,154 @@
+"""
+Columnar (Parquet / Arrow IPC) export of forecasts, scenarios and projections.
+
+Every file carries the BachatConfig that produced it as schema metadata
+(``bachat.config``), alongside the engine version and what the table holds,
+so a download can be traced back to its exact inputs:
+
+    data = export_bytes(forecast_table(df, cfg), "parquet")
+    df, cfg, meta = read_export(data)
+
+Frames go to Arrow without a CSV detour; numeric columns convert zero-copy.
+"""
+
+import json
+import os
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .engine import (
+    ENGINE_VERSION, BachatConfig, config_from_dict, config_to_dict,
+    scenario_overrides,
+)
+
+# format: (file extension, MIME type)
+EXPORT_FORMATS = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow":   ("arrow",   "application/vnd.apache.arrow.file"),
+}
+
+META_CONFIG  = b"bachat.config"
+META_ENGINE  = b"bachat.engine_version"
+META_KIND    = b"bachat.kind"
+META_EXTRA   = b"bachat.extra"
+
+_MAGIC = {b"PAR1": "parquet", b"ARROW1": "arrow"}
+
+
+# =============================================================================
+# TABLES
+# =============================================================================
+
+def _with_metadata(table: pa.Table, cfg: BachatConfig, kind: str,
+                   extra: Optional[Dict] = None) -> pa.Table:
+    meta = dict(table.schema.metadata or {})
+    meta[META_CONFIG] = json.dumps(config_to_dict(cfg)).encode()
+    meta[META_ENGINE] = ENGINE_VERSION.encode()
+    meta[META_KIND]   = kind.encode()
+    if extra:
+        meta[META_EXTRA] = json.dumps(extra, default=str).encode()
+    return table.replace_schema_metadata(meta)
+
+
+def forecast_table(df: pd.DataFrame, cfg: BachatConfig,
+                   kind: str = "forecast", extra: Optional[Dict] = None) -> pa.Table:
+    """Arrow table of any forecast-shaped frame (forecast, yearly projection…)."""
+    return _with_metadata(pa.Table.from_pandas(df, preserve_index=False),
+                          cfg, kind, extra)
+
+
+def scenarios_table(frames: Dict[str, pd.DataFrame], cfg: BachatConfig,
+                    overrides: Optional[Dict[str, Dict]] = None) -> pa.Table:
+    """build_scenarios output stacked into one table with a leading
+    dictionary-encoded `scenario` column; the per-scenario overrides
+    (default: scenario_overrides(cfg)) are stored as metadata."""
+    if not frames:
+        raise ValueError("No scenario frames to export.")
+    # Compact frames may differ per scenario (an int32 column left int64 where
+    # it overflowed); widen to one schema before stacking.
+    first  = next(iter(frames.values()))
+    common = {c: np.result_type(*(f[c].dtype for f in frames.values()))
+              for c in first.columns}
+    names  = pa.array(list(frames), pa.string())
+    parts  = []
+    for i, sdf in enumerate(frames.values()):
+        t    = pa.Table.from_pandas(sdf.astype(common, copy=False),
+                                    preserve_index=False)
+        tags = pa.DictionaryArray.from_arrays(
+            pa.array(np.full(t.num_rows, i, dtype=np.int32)), names)
+        parts.append(t.replace_schema_metadata(None).add_column(0, "scenario", tags))
+    table = pa.concat_tables(parts)
+    overrides = scenario_overrides(cfg) if overrides is None else overrides
+    return _with_metadata(table, cfg, "scenarios",
+                          {"scenarios": list(frames), "overrides": overrides})
+
+
+# =============================================================================
+# WRITING / READING
+# =============================================================================
+
+def _check_format(fmt: str) -> None:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. "
+                         f"Use one of {', '.join(EXPORT_FORMATS)}.")
+
+
+def write_table(table: pa.Table, sink, fmt: str = "parquet") -> None:
+    """Write to a path or writable Arrow / Python stream."""
+    _check_format(fmt)
+    if fmt == "parquet":
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def export_bytes(table: pa.Table, fmt: str = "parquet") -> bytes:
+    """Encoded file contents, e.g. for a download button."""
+    buf = pa.BufferOutputStream()
+    write_table(table, buf, fmt)
+    return buf.getvalue().to_pybytes()
+
+
+def _sniff(source: Union[str, bytes]) -> str:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:6])
+    else:
+        with open(source, "rb") as fh:
+            head = fh.read(6)
+    for magic, fmt in _MAGIC.items():
+        if head.startswith(magic):
+            return fmt
+    raise ValueError("Not a Parquet or Arrow IPC file.")
+
+
+def read_export(source: Union[str, bytes], fmt: Optional[str] = None
+                ) -> Tuple[pd.DataFrame, Optional[BachatConfig], Dict]:
+    """Read an exported file (path or bytes) back into
+    (DataFrame, BachatConfig or None, metadata dict)."""
+    fmt = fmt or _sniff(source)
+    _check_format(fmt)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = pa.BufferReader(source)
+    if fmt == "parquet":
+        table = pq.read_table(source)
+    else:
+        if isinstance(source, str):
+            source = pa.memory_map(os.fspath(source))
+        table = pa.ipc.open_file(source).read_all()
+
+    raw  = table.schema.metadata or {}
+    meta = {"kind":           raw.get(META_KIND, b"").decode() or None,
+            "engine_version": raw.get(META_ENGINE, b"").decode() or None}
+    if META_EXTRA in raw:
+        meta.update(json.loads(raw[META_EXTRA]))
+    cfg = (config_from_dict(json.loads(raw[META_CONFIG]))
+           if META_CONFIG in raw else None)
+    df = table.to_pandas()
+    if "scenario" in df.columns:
+        df["scenario"] = df["scenario"].astype(str)
+    return df, cfg, meta
@@ -0,0 +1,510 @@
+"""
+Earlier-generation forecast models as pure functions of a config.
+
+The v3, v4 and v6 Streamlit apps computed their per-slot tables inline at import.
+Here each model takes its config dataclass and returns the same DataFrame,
+either with the app's original month × duration × slab × slot loop
+(mode="legacy") or with broadcast NumPy over a padded (month, duration, slab,
+slot) grid (mode="vectorized", the default), which reproduces the loop's
+table exactly — values, dtypes and row order.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .trace import traced
+
+BLOCKED_FEE = 99                      # slot-fee sentinel meaning "slot blocked"
+MODES       = ("vectorized", "legacy")
+V3_COLUMNS  = ["Month", "Duration", "Slab", "Slot", "Users", "Deposit", "Fee %",
+               "Fee Collected", "NII", "Profit", "Year"]
+V4_COLUMNS  = ["Month", "Duration", "Slab", "Slot", "Users", "Fee %",
+               "Deposit", "Fee Collected", "NII", "Profit", "Year"]
+V6_COLUMNS  = ["Month", "Year", "Duration", "Slab", "Slot", "Users", "Fee %",
+               "Deposit", "Fee Collected", "NII", "Profit", "Rejoining Customers"]
+
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+@dataclass
+class V3Config:
+    """Inputs of the v3 app (sidebar defaults): one slot-fee row shared by
+    every duration and no slot blocking."""
+    initial_tam: int = 200_000
+    kibor: float = 11.0
+    spread: float = 5.0
+    default_rate: float = 1.0
+    rest_period: int = 1                                   # collected, unused by v3
+    fee_upfront: bool = True
+    growth_rates: List[float] = field(default_factory=lambda: [2.0, 1.8, 1.5, 1.2, 1.0])
+    durations: List[int] = field(default_factory=lambda: [3, 4, 5, 6, 8, 10])
+    duration_alloc: Dict[int, float] = field(default_factory=lambda: {
+        3: 30, 4: 25, 5: 15, 6: 10, 8: 10, 10: 10})
+    slot_fees: Dict[int, float] = field(default_factory=lambda: {
+        i: 11 - i for i in range(1, 11)})
+    slabs: List[int] = field(default_factory=lambda: [
+        1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000])
+    participation_caps: Dict[int, int] = field(default_factory=lambda: {
+        3: 3, 4: 2, 5: 1, 6: 1, 8: 1, 10: 1})              # unused by v3
+    months: int = 60
+
+
+def validate_v3_config(cfg: V3Config) -> None:
+    """Raise ValueError for configs the v3 model cannot run."""
+    if cfg.months < 1:
+        raise ValueError("months must be at least 1.")
+    years = min((cfg.months - 1) // 12 + 1, 5)            # year 5's rate repeats
+    if len(cfg.growth_rates) < years:
+        raise ValueError(f"growth_rates has {len(cfg.growth_rates)} rate(s) but "
+                         f"{years} are needed.")
+    if not cfg.slabs or not cfg.durations:
+        raise ValueError("slabs and durations must not be empty.")
+    missing = [d for d in cfg.durations if d not in cfg.duration_alloc]
+    if missing:
+        raise ValueError(f"No allocation for duration(s): "
+                         f"{', '.join(map(str, missing))}.")
+    slots = [s for s in range(1, max(cfg.durations) + 1) if s not in cfg.slot_fees]
+    if slots:
+        raise ValueError(f"No fee for slot(s): {', '.join(map(str, slots))}.")
+
+
+def _default_v4_slot_fee() -> Dict[int, Dict[int, int]]:
+    return {d: {s: (11 - s) if s <= 10 else 0 for s in range(1, d + 1)}
+            for d in (3, 4, 5, 6, 8, 10)}
+
+
+@dataclass
+class V4Config:
+    """Inputs of the v4 app (sidebar defaults)."""
+    initial_tam: int = 200_000
+    rest_period: int = 1                                   # collected, unused by v4
+    kibor: float = 11.0
+    spread: float = 5.0
+    default_rate: float = 1.0
+    fee_upfront: bool = True
+    growth_rates: List[float] = field(default_factory=lambda: [2.0, 1.8, 1.5, 1.2, 1.0])
+    participation_caps: Dict[int, int] = field(default_factory=lambda: {
+        3: 3, 4: 2, 5: 1, 6: 1, 8: 1, 10: 1})              # collected, unused by v4
+    durations: List[int] = field(default_factory=lambda: [3, 4, 5, 6, 8, 10])
+    duration_alloc: Dict[int, float] = field(default_factory=lambda: {
+        3: 30, 4: 25, 5: 15, 6: 10, 8: 10, 10: 10})
+    slot_fee: Dict[int, Dict[int, int]] = field(default_factory=_default_v4_slot_fee)
+    slabs: List[int] = field(default_factory=lambda: [
+        1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000])
+    months: int = 60
+
+
+def validate_v4_config(cfg: V4Config) -> None:
+    """Raise ValueError for configs the v4 model cannot run."""
+    years = (cfg.months - 1) // 12 + 1 if cfg.months > 0 else 0
+    if cfg.months < 1:
+        raise ValueError("months must be at least 1.")
+    if len(cfg.growth_rates) < years:
+        raise ValueError(f"growth_rates has {len(cfg.growth_rates)} rate(s) but "
+                         f"{cfg.months} months span {years} year(s).")
+    if not cfg.slabs or not cfg.durations:
+        raise ValueError("slabs and durations must not be empty.")
+    missing = [d for d in cfg.durations
+               if d not in cfg.duration_alloc or d not in cfg.slot_fee]
+    if missing:
+        raise ValueError(f"No allocation / slot-fee row for duration(s): "
+                         f"{', '.join(map(str, missing))}.")
+
+
+def _default_v6_slot_fees() -> Dict[int, Dict[int, int]]:
+    return {d: {s: max(0, 11 - s) for s in range(1, d + 1)}
+            for d in (3, 4, 5, 6, 8, 10)}
+
+
+@dataclass
+class V6Config:
+    """Inputs of the v6 app (sidebar defaults); `months` was fixed at 60."""
+    total_market: int = 20_000_000
+    tam_percent: float = 10
+    starting_user_percent: float = 10
+    monthly_growth: float = 2.0
+    kibor: float = 11.0
+    spread: float = 5.0
+    default_rate: float = 1.0
+    rest_period: int = 1
+    fee_upfront: bool = True
+    participation_caps: Dict[int, int] = field(default_factory=lambda: {
+        3: 3, 4: 2, 5: 1, 6: 1, 8: 1, 10: 1})              # collected, unused by v6
+    durations: List[int] = field(default_factory=lambda: [3, 4, 5, 6, 8, 10])
+    slabs: List[int] = field(default_factory=lambda: [
+        1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000])
+    duration_alloc: Dict[int, float] = field(default_factory=lambda: {
+        3: 30, 4: 25, 5: 15, 6: 10, 8: 10, 10: 10})
+    slot_fees: Dict[int, Dict[int, int]] = field(default_factory=_default_v6_slot_fees)
+    months: int = 60
+
+    @property
+    def user_base(self) -> float:
+        initial_tam = self.total_market * (self.tam_percent / 100)
+        return initial_tam * (self.starting_user_percent / 100)
+
+
+def validate_v6_config(cfg: V6Config) -> None:
+    """Raise ValueError for configs the v6 model cannot run."""
+    if cfg.months < 1:
+        raise ValueError("months must be at least 1.")
+    if cfg.rest_period < 0:
+        raise ValueError("rest_period must not be negative.")
+    if not cfg.slabs:
+        raise ValueError("slabs must not be empty.")
+    missing = [d for d in cfg.durations if d not in cfg.duration_alloc
+               or any(s not in cfg.slot_fees.get(d, {}) for s in range(1, d + 1))]
+    if missing:
+        raise ValueError(f"No allocation / full slot-fee row for duration(s): "
+                         f"{', '.join(map(str, missing))}.")
+    if any(d < 1 for d in cfg.durations):
+        raise ValueError("durations must be at least 1 month.")
+    if not any(cfg.duration_alloc[d] for d in cfg.durations):
+        raise ValueError("At least one duration needs a non-zero allocation.")
+
+
+# =============================================================================
+# V3 MODEL
+# =============================================================================
+
+def _v3_loop(cfg: V3Config) -> pd.DataFrame:
+    """The v3 app's original per-cell loop, kept verbatim as the reference."""
+    months, durations, slabs, slot_fees = cfg.months, cfg.durations, cfg.slabs, cfg.slot_fees
+    kibor, spread, default_rate, fee_upfront = cfg.kibor, cfg.spread, cfg.default_rate, cfg.fee_upfront
+    forecast = []
+
+    monthly_growth_factors = []
+    for i in range(months):
+        year_idx = min(i // 12, 4)
+        rate = cfg.growth_rates[year_idx] / 100
+        monthly_growth_factors.append((1 + rate) ** (i % 12))
+
+    for month in range(1, months + 1):
+        month_idx = month - 1
+        tam = cfg.initial_tam * monthly_growth_factors[month_idx]
+        for d in durations:
+            users_by_duration = tam * (cfg.duration_alloc[d] / 100)
+            per_slab = users_by_duration / len(slabs)
+            for slab in slabs:
+                for slot in range(1, d + 1):
+                    fee_pct = slot_fees[slot] / 100
+                    deposit = per_slab * slab * d
+                    fee_collected = deposit * fee_pct if fee_upfront else 0
+                    nii = deposit * ((kibor + spread) / 100 / 12)
+                    profit = fee_collected + nii - (deposit * (default_rate / 100))
+                    forecast.append({
+                        "Month": month,
+                        "Duration": d,
+                        "Slab": slab,
+                        "Slot": slot,
+                        "Users": per_slab,
+                        "Deposit": deposit,
+                        "Fee %": fee_pct,
+                        "Fee Collected": fee_collected,
+                        "NII": nii,
+                        "Profit": profit
+                    })
+
+    df = pd.DataFrame(forecast)
+    df["Year"] = ((df["Month"] - 1) // 12) + 1
+    return df
+
+
+def _v3_vectorized(cfg: V3Config) -> pd.DataFrame:
+    """Broadcast form of _v3_loop (see _slot_grid, run without blocking)."""
+    tam   = np.array([cfg.initial_tam * ((1 + cfg.growth_rates[min(i // 12, 4)] / 100)
+                                         ** (i % 12)) for i in range(cfg.months)],
+                     dtype=float)
+    alloc = np.array([cfg.duration_alloc[d] / 100 for d in cfg.durations], dtype=float)
+    fees  = {d: {s: cfg.slot_fees[s] for s in range(1, d + 1)} for d in cfg.durations}
+    cols, _ = _slot_grid((tam[:, None] * alloc[None, :]) / len(cfg.slabs),
+                         cfg.durations, cfg.slabs, fees, cfg.fee_upfront,
+                         (cfg.kibor + cfg.spread) / 100 / 12,
+                         lambda deposit: deposit * (cfg.default_rate / 100),
+                         blocking=False)
+    cols["Fee %"] = cols["Fee %"] / 100
+    df = pd.DataFrame({c: cols[c] for c in V3_COLUMNS[:-1]})
+    df["Year"] = ((df["Month"] - 1) // 12) + 1
+    return df
+
+
+@traced
+def build_forecast_v3(cfg: V3Config, mode: str = "vectorized") -> pd.DataFrame:
+    """v3 per-slot forecast table (columns V3_COLUMNS), one row per
+    month × duration × slab × slot.  mode: "vectorized" or "legacy"."""
+    _check_mode(mode)
+    validate_v3_config(cfg)
+    return _v3_vectorized(cfg) if mode == "vectorized" else _v3_loop(cfg)
+
+
+# =============================================================================
+# V4 MODEL
+# =============================================================================
+
+def _v4_loop(cfg: V4Config) -> pd.DataFrame:
+    """The v4 app's original per-cell loop, kept verbatim as the reference."""
+    kibor, spread, default_rate = cfg.kibor, cfg.spread, cfg.default_rate
+    fee_upfront, slabs, slot_fee = cfg.fee_upfront, cfg.slabs, cfg.slot_fee
+    results = []
+    for m in range(1, cfg.months + 1):
+        year_idx = (m - 1) // 12
+        monthly_growth = cfg.growth_rates[year_idx] / 100
+        tam = cfg.initial_tam * ((1 + monthly_growth) ** ((m - 1) % 12))
+
+        for d in cfg.durations:
+            duration_users = tam * (cfg.duration_alloc[d] / 100)
+            users_per_slab = duration_users / len(slabs)
+
+            for slab in slabs:
+                for slot in range(1, d + 1):
+                    fee_pct = slot_fee[d].get(slot, 0)
+                    if fee_pct == BLOCKED_FEE:
+                        users = 0
+                        deposit = 0
+                        fee_collected = 0
+                        nii = 0
+                        profit = 0
+                    else:
+                        users = users_per_slab
+                        deposit = users * slab * d
+                        fee_collected = deposit * (fee_pct / 100) if fee_upfront else 0
+                        nii = deposit * ((kibor + spread) / 100 / 12)
+                        profit = fee_collected + nii - (deposit * (default_rate / 100))
+
+                    results.append({
+                        "Month": m,
+                        "Duration": d,
+                        "Slab": slab,
+                        "Slot": slot,
+                        "Users": users,
+                        "Fee %": fee_pct,
+                        "Deposit": deposit,
+                        "Fee Collected": fee_collected,
+                        "NII": nii,
+                        "Profit": profit
+                    })
+
+    df = pd.DataFrame(results)
+    df["Year"] = ((df["Month"] - 1) // 12) + 1
+    return df
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Use one of {', '.join(MODES)}.")
+
+
+def _slot_grid(users_per_slab: np.ndarray, durations: List[int], slabs: List[int],
+               slot_fee: Dict[int, Dict[int, int]], fee_upfront: bool,
+               nii_rate: float, default_loss: Callable[[np.ndarray], np.ndarray],
+               blocking: bool = True) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Per-slot columns of the v3 / v4 / v6 tables from users per slab (M, D).
+
+    Broadcasts over a (M, D, S, K) grid, K = longest duration: slots past a
+    duration are padding dropped by `valid`, fee 99 is the `blocked` mask
+    (v3 has no blocking: blocking=False).
+    Element-wise operations follow the loops' order, so the floats are
+    bit-identical.  Returns (flat columns in loop row order, valid mask).
+    """
+    M, D = users_per_slab.shape
+    S    = len(slabs)
+    durs = np.asarray(durations, dtype=np.int64)
+    K    = int(durs.max()) if D else 0
+    slot = np.arange(1, K + 1)
+    fee  = np.array([[slot_fee[d].get(k, 0) for k in slot]
+                     for d in durations]).reshape(D, K)
+
+    shape   = (M, D, S, K)
+    valid   = np.broadcast_to((slot[None, :] <= durs[:, None])[None, :, None, :], shape)
+    blocked = ((fee == BLOCKED_FEE) & blocking)[None, :, None, :]
+    slab_g  = np.asarray(slabs)[None, None, :, None]
+
+    users   = np.where(blocked, 0.0, users_per_slab[:, :, None, None])
+    deposit = np.where(blocked, 0.0, users * slab_g * durs[None, :, None, None])
+    fee_col = (deposit * (fee / 100)[None, :, None, :] if fee_upfront
+               else np.zeros(shape))
+    fee_col = np.where(blocked, 0.0, fee_col)
+    nii     = deposit * nii_rate
+    profit  = np.where(blocked, 0.0, fee_col + nii - default_loss(deposit))
+
+    def flat(a) -> np.ndarray:
+        return np.broadcast_to(a, shape)[valid]
+
+    cols = {
+        "Month":         flat(np.arange(1, M + 1)[:, None, None, None]),
+        "Duration":      flat(durs[None, :, None, None]),
+        "Slab":          flat(slab_g),
+        "Slot":          flat(slot[None, None, None, :]),
+        "Users":         flat(users),
+        "Fee %":         flat(fee[None, :, None, :]),
+        "Deposit":       flat(deposit),
+        "Fee Collected": flat(fee_col),
+        "NII":           flat(nii),
+        "Profit":        flat(profit),
+    }
+    # The loops store int 0 for blocked cells, so a column that never saw a
+    # float comes out int64 there; mirror that.
+    has_float = bool((~blocked & valid[:1, :, :1, :]).any())
+    int_cols  = ["Users", "Deposit", "NII", "Profit"] if not has_float else []
+    if not has_float or not fee_upfront:
+        int_cols.append("Fee Collected")
+    for c in int_cols:
+        cols[c] = cols[c].astype(np.int64)
+    return cols, valid
+
+
+def _v4_vectorized(cfg: V4Config) -> pd.DataFrame:
+    """Broadcast form of _v4_loop (see _slot_grid)."""
+    # Per-month TAM with Python's float pow on Python ints (NumPy's pow can
+    # differ in the last bit).
+    tam   = np.array([cfg.initial_tam * ((1 + cfg.growth_rates[(m - 1) // 12] / 100)
+                                         ** ((m - 1) % 12)) for m in range(1, cfg.months + 1)],
+                     dtype=float)
+    alloc = np.array([cfg.duration_alloc[d] / 100 for d in cfg.durations], dtype=float)
+    cols, _ = _slot_grid((tam[:, None] * alloc[None, :]) / len(cfg.slabs),
+                         cfg.durations, cfg.slabs, cfg.slot_fee, cfg.fee_upfront,
+                         (cfg.kibor + cfg.spread) / 100 / 12,
+                         lambda deposit: deposit * (cfg.default_rate / 100))
+    df = pd.DataFrame(cols)
+    df["Year"] = ((df["Month"] - 1) // 12) + 1
+    return df
+
+
+@traced
+def build_forecast_v4(cfg: V4Config, mode: str = "vectorized") -> pd.DataFrame:
+    """v4 per-slot forecast table (columns V4_COLUMNS), one row per
+    month × duration × slab × slot.  mode: "vectorized" or "legacy"."""
+    _check_mode(mode)
+    validate_v4_config(cfg)
+    return _v4_vectorized(cfg) if mode == "vectorized" else _v4_loop(cfg)
+
+
+# =============================================================================
+# V6 MODEL
+# =============================================================================
+
+def _v6_loop(cfg: V6Config) -> pd.DataFrame:
+    """The v6 app's original month loop, kept verbatim as the reference."""
+    months, durations, slabs = cfg.months, cfg.durations, cfg.slabs
+    duration_alloc, slot_fees, rest_period = cfg.duration_alloc, cfg.slot_fees, cfg.rest_period
+    kibor, spread, default_rate = cfg.kibor, cfg.spread, cfg.default_rate
+    monthly_growth, fee_upfront = cfg.monthly_growth, cfg.fee_upfront
+    results, user_pool, rejoining_track = [], cfg.user_base, [0]*months
+
+    for m in range(1, months + 1):
+        new_users = user_pool if m == 1 else user_pool * (1 + monthly_growth / 100)
+        rejoining = rejoining_track[m-1] if m-1 < len(rejoining_track) else 0
+        total_users = new_users + rejoining
+
+        for d in durations:
+            if duration_alloc[d] == 0:
+                continue
+
+            users_by_duration = total_users * (duration_alloc[d] / 100)
+            per_slab_users = users_by_duration / len(slabs)
+
+            if (m + d + rest_period) < months:
+                rejoining_track[m + d + rest_period] += users_by_duration
+
+            for slab in slabs:
+                for slot in range(1, d + 1):
+                    fee = slot_fees[d][slot]
+                    if fee == BLOCKED_FEE:
+                        deposit, fee_collected, nii, profit, users = 0, 0, 0, 0, 0
+                    else:
+                        users = per_slab_users
+                        deposit = users * slab * d
+                        fee_collected = deposit * (fee / 100) if fee_upfront else 0
+                        nii = deposit * ((kibor + spread) / 100 / 12)
+                        profit = fee_collected + nii - (deposit * default_rate / 100)
+
+                    results.append({
+                        "Month": m, "Year": (m - 1) // 12 + 1, "Duration": d, "Slab": slab, "Slot": slot,
+                        "Users": users, "Fee %": fee, "Deposit": deposit,
+                        "Fee Collected": fee_collected, "NII": nii, "Profit": profit,
+                        "Rejoining Customers": rejoining if slot == 1 and slab == slabs[0] else 0
+                    })
+
+        user_pool = total_users
+
+    return pd.DataFrame(results, columns=V6_COLUMNS)
+
+
+def v6_user_flows(cfg: V6Config) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(total users (M,), rejoining users (M,), rejoined mask (M,)) of the v6
+    growth / rejoining recurrence.
+
+    A cohort starting a d-month committee in month m rejoins in month
+    m + d + rest_period + 1 (it is booked on index m + d + rest of a
+    0-based track read at month m + 1).  Since every lag is at least
+    L = min(d) + rest, months are processed in blocks of L: a block's
+    rejoiners all come from earlier blocks, so its cohort matrix
+    (block × duration) is formed at once and pushed forward with one shifted
+    slice add per duration.  Only the scalar growth step runs per month.
+    Durations are added longest lag first, which keeps each track entry's
+    additions in the loop's chronological order (bit-identical floats).
+    Work is O(months × durations).
+    """
+    M      = cfg.months
+    active = [d for d in cfg.durations if cfg.duration_alloc[d] != 0]
+    alloc  = np.array([cfg.duration_alloc[d] / 100 for d in active], dtype=float)
+    lag    = np.array(active, dtype=np.int64) + cfg.rest_period
+    order  = np.argsort(-lag, kind="stable")
+    step   = int(lag.min()) if len(lag) else M
+    growth = 1 + cfg.monthly_growth / 100
+
+    track   = np.zeros(M)                 # rejoining_track, read at k = m - 1
+    touched = np.zeros(M, dtype=bool)
+    totals  = np.empty(M)
+    pool    = cfg.user_base
+    for t in range(0, M, step):
+        stop = min(M, t + step)
+        for k in range(t, stop):
+            pool = totals[k] = (pool if k == 0 else pool * growth) + track[k]
+        if not len(active):
+            continue
+        cohorts = totals[t:stop, None] * alloc[None, :]
+        for j in order:
+            first = t + 1 + lag[j]                       # target of month k = t
+            n     = max(0, min(stop, M - 1 - lag[j]) - t)
+            if n:
+                track[first:first + n]   += cohorts[:n, j]
+                touched[first:first + n]  = True
+    return totals, track, touched
+
+
+def _v6_vectorized(cfg: V6Config) -> pd.DataFrame:
+    """Cohort-matrix form of _v6_loop (see v6_user_flows and _slot_grid)."""
+    totals, rejoining, touched = v6_user_flows(cfg)
+    active = [d for d in cfg.durations if cfg.duration_alloc[d] != 0]
+    alloc  = np.array([cfg.duration_alloc[d] / 100 for d in active], dtype=float)
+    cols, valid = _slot_grid((totals[:, None] * alloc[None, :]) / len(cfg.slabs),
+                             active, cfg.slabs, cfg.slot_fees, cfg.fee_upfront,
+                             (cfg.kibor + cfg.spread) / 100 / 12,
+                             lambda deposit: deposit * cfg.default_rate / 100)
+
+    # "Rejoining Customers" sits on each month's slot-1 row of the first slab.
+    M, D, S, K = valid.shape
+    first = ((np.arange(1, K + 1) == 1)[None, None, None, :]
+             & (np.asarray(cfg.slabs) == cfg.slabs[0])[None, None, :, None])
+    rejoin = np.where(first, rejoining[:, None, None, None], 0.0)
+    cols["Rejoining Customers"] = np.broadcast_to(rejoin, valid.shape)[valid]
+    if not touched.any():
+        cols["Rejoining Customers"] = cols["Rejoining Customers"].astype(np.int64)
+    cols["Year"] = (cols["Month"] - 1) // 12 + 1
+    return pd.DataFrame({c: cols[c] for c in V6_COLUMNS})
+
+
+@traced
+def build_forecast_v6(cfg: V6Config, mode: str = "vectorized") -> pd.DataFrame:
+    """v6 per-slot forecast table (columns V6_COLUMNS) with the rejoining
+    pool, one row per month × funded duration × slab × slot.
+    mode: "vectorized" or "legacy"."""
+    _check_mode(mode)
+    validate_v6_config(cfg)
+    return _v6_vectorized(cfg) if mode == "vectorized" else _v6_loop(cfg)
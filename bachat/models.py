@@ -0,0 +1,212 @@
+"""
+Registry of every forecast model generation behind one contract.
+
+    frames, _ = run_models(["v4", "v6", "ultimate"], cache=ForecastCache())
+    diff_models(frames["v4"], frames["v6"], by=["year"])
+
+Each model — the v3, v4 and v6 per-slot apps (bachat.legacy) and the
+ultimate BachatConfig engine — is a ForecastModel: a pure callable from its
+config dataclass to a frame in the common COMMON_COLUMNS schema, one row per
+month × duration × slab (the per-slot tables are summed over slots).  Each
+model caches under its own key namespace and ENGINE_VERSION covers this
+module and bachat.legacy, so one ForecastCache (disk store included) can
+serve all models and the app's native forecasts at once.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .engine import BachatConfig, ForecastCache, build_forecast
+from .legacy import (
+    V3Config, V4Config, V6Config, build_forecast_v3, build_forecast_v4,
+    build_forecast_v6,
+)
+
+COMMON_KEYS    = ["month", "year", "duration", "slab"]
+COMMON_METRICS = ["users", "deposits", "fee_income", "nii", "revenue",
+                  "default_loss", "profit"]
+COMMON_COLUMNS = COMMON_KEYS + COMMON_METRICS
+
+
+# =============================================================================
+# COMMON SCHEMA
+# =============================================================================
+
+def _common_frame(cols: Dict[str, Any]) -> pd.DataFrame:
+    df = pd.DataFrame(cols, columns=COMMON_COLUMNS)
+    return df.astype({**{k: np.int64 for k in COMMON_KEYS},
+                      **{m: np.float64 for m in COMMON_METRICS}})
+
+
+def common_from_slots(df: pd.DataFrame) -> pd.DataFrame:
+    """v3 / v4 / v6 per-slot table summed over slots (as the apps' own
+    summaries do); revenue = fees + NII, default_loss = revenue - profit."""
+    g = (df.groupby(["Month", "Year", "Duration", "Slab"], sort=False)
+           [["Users", "Deposit", "Fee Collected", "NII", "Profit"]].sum()
+           .reset_index())
+    revenue = g["Fee Collected"] + g["NII"]
+    return _common_frame({
+        "month": g["Month"], "year": g["Year"],
+        "duration": g["Duration"], "slab": g["Slab"],
+        "users": g["Users"], "deposits": g["Deposit"],
+        "fee_income": g["Fee Collected"], "nii": g["NII"],
+        "revenue": revenue, "default_loss": revenue - g["Profit"],
+        "profit": g["Profit"],
+    })
+
+
+def common_from_forecast(df: pd.DataFrame) -> pd.DataFrame:
+    """build_forecast frame in the common schema (users = active users)."""
+    return _common_frame({
+        "month": df["month"], "year": df["year"],
+        "duration": df["duration"], "slab": df["slab_amount"],
+        "users": df["active_users"],
+        "deposits": df["user_contributions_monthly"],
+        "fee_income": df["fees_monthly"],
+        "nii": (df["base_nii_monthly"] + df["float_nii_monthly"]
+                + df["fee_nii_monthly"]),
+        "revenue": df["total_revenue_monthly"],
+        "default_loss": df["default_loss_monthly"],
+        "profit": df["net_profit_monthly"],
+    })
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+@dataclass(frozen=True)
+class ForecastModel:
+    """One model generation: `build` returns its native table, `common` maps
+    that table to COMMON_COLUMNS.  Calling the model does both."""
+    name: str
+    config_type: type
+    build: Callable[[Any], pd.DataFrame]
+    common: Callable[[pd.DataFrame], pd.DataFrame]
+    description: str = ""
+
+    def config(self, cfg: Any = None) -> Any:
+        """cfg checked against config_type; None gives the model's defaults."""
+        if cfg is None:
+            return self.config_type()
+        if not isinstance(cfg, self.config_type):
+            raise ValueError(f"Model '{self.name}' takes a "
+                             f"{self.config_type.__name__}, "
+                             f"not {type(cfg).__name__}.")
+        return cfg
+
+    def __call__(self, cfg: Any = None) -> pd.DataFrame:
+        return self.common(self.build(self.config(cfg)))
+
+
+MODELS: Dict[str, ForecastModel] = {}
+
+
+def register_model(model: ForecastModel, replace: bool = False) -> ForecastModel:
+    if model.name in MODELS and not replace:
+        raise ValueError(f"Model '{model.name}' is already registered.")
+    MODELS[model.name] = model
+    return model
+
+
+def get_model(name: str) -> ForecastModel:
+    if name not in MODELS:
+        raise ValueError(f"Unknown model '{name}'. "
+                         f"Use one of {', '.join(MODELS)}.")
+    return MODELS[name]
+
+
+for _model in (
+    ForecastModel("v3", V3Config, build_forecast_v3, common_from_slots,
+                  "One slot-fee row for all durations, yearly TAM growth."),
+    ForecastModel("v4", V4Config, build_forecast_v4, common_from_slots,
+                  "Per-duration slot-fee matrix with fee 99 blocking a slot."),
+    ForecastModel("v6", V6Config, build_forecast_v6, common_from_slots,
+                  "Monthly growth with a rejoining pool after each cycle."),
+    ForecastModel("ultimate", BachatConfig, build_forecast, common_from_forecast,
+                  "Lifecycle, float / fee NII, default split and TAM shares."),
+):
+    register_model(_model)
+
+
+# =============================================================================
+# RUNNING
+# =============================================================================
+
+def run_model(name: str, cfg: Any = None,
+              cache: Optional[ForecastCache] = None) -> pd.DataFrame:
+    """Common-schema forecast of one model (defaults when cfg is None).
+    Cached under the model's own namespace, so a cache shared with native
+    build_forecast lookups never mixes the two schemas.  Frames served from
+    `cache` are shared — treat them as read-only."""
+    model = get_model(name)
+    cfg   = model.config(cfg)
+    if cache is None:
+        return model(cfg)
+    return cache.forecast(cfg, model, namespace=f"model.{name}")
+
+
+def run_models(names: Optional[Sequence[str]] = None,
+               configs: Optional[Dict[str, Any]] = None,
+               cache: Optional[ForecastCache] = None
+               ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, float]]:
+    """Run several models (default: every registered one, or the keys of
+    `configs`, {model name: config}).  Returns ({name: frame},
+    {name: seconds}) in the order given."""
+    configs = configs or {}
+    names   = list(names) if names is not None else list(configs or MODELS)
+    frames, seconds = {}, {}
+    for name in names:
+        t0 = time.perf_counter()
+        frames[name]  = run_model(name, configs.get(name), cache)
+        seconds[name] = time.perf_counter() - t0
+    return frames, seconds
+
+
+def stack_models(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """One long frame with a leading `model` column."""
+    if not frames:
+        raise ValueError("No model frames to stack.")
+    return pd.concat([df.assign(model=name)[["model"] + COMMON_COLUMNS]
+                      for name, df in frames.items()], ignore_index=True)
+
+
+def summarize_models(frames: Dict[str, pd.DataFrame],
+                     by: Sequence[str] = ("year",)) -> pd.DataFrame:
+    """Metric totals per model and `by` key(s), models side by side."""
+    stacked = stack_models(frames)
+    return (stacked.groupby(["model", *by], sort=False)[COMMON_METRICS].sum()
+                   .reset_index())
+
+
+def diff_models(base: pd.DataFrame, other: pd.DataFrame,
+                by: Sequence[str] = COMMON_KEYS) -> pd.DataFrame:
+    """other - base per metric after summing each over `by`.  Keys only one
+    side has count as zero on the other (e.g. durations one model lacks)."""
+    by = list(by)
+    a  = base.groupby(by)[COMMON_METRICS].sum()
+    b  = other.groupby(by)[COMMON_METRICS].sum()
+    return b.sub(a, fill_value=0.0).reset_index()
+
+
+def benchmark_models(names: Optional[Sequence[str]] = None,
+                     configs: Optional[Dict[str, Any]] = None,
+                     repeat: int = 5) -> pd.DataFrame:
+    """Uncached wall time per model: rows, best and mean milliseconds."""
+    configs = configs or {}
+    rows: List[Dict] = []
+    for name in (list(names) if names is not None else list(configs or MODELS)):
+        model = get_model(name)
+        cfg   = model.config(configs.get(name))
+        times = []
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            df = model(cfg)
+            times.append((time.perf_counter() - t0) * 1e3)
+        rows.append({"model": name, "rows": len(df),
+                     "best_ms": min(times), "mean_ms": float(np.mean(times))})
+    return pd.DataFrame(rows)
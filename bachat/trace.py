@@ -0,0 +1,115 @@
+"""
+Lightweight timing layer for engine stages and UI renderers.
+
+A Tracer collects spans (name, start offset, duration, nesting depth).  Code
+marks work with ``with tracer.span("name")`` or decorates a function with
+``@traced``; decorated functions report into whichever Tracer is active in
+the current context and cost a single ContextVar lookup when none is.
+"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+_ACTIVE: ContextVar[Optional["Tracer"]] = ContextVar("bachat_tracer", default=None)
+
+
+class Tracer:
+    """Per-run span recorder.  Thread-safe; nesting is tracked per context."""
+
+    def __init__(self, label: str = ""):
+        self.label   = label
+        self.started = time.time()
+        self._t0     = time.perf_counter()
+        self._lock   = threading.Lock()
+        self._depth  = ContextVar(f"bachat_tracer_depth_{id(self)}", default=0)
+        self.events: List[Dict] = []
+
+    @contextmanager
+    def span(self, name: str, **meta):
+        depth = self._depth.get()
+        token = self._depth.set(depth + 1)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._depth.reset(token)
+            event = {"name":     name,
+                     "start_ms": (start - self._t0) * 1e3,
+                     "ms":       (end - start) * 1e3,
+                     "depth":    depth}
+            if meta:
+                event["meta"] = meta
+            with self._lock:
+                self.events.append(event)
+
+    @contextmanager
+    def activate(self):
+        """Make this the tracer that @traced functions report into."""
+        token = _ACTIVE.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE.reset(token)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1e3
+
+    def summary(self) -> List[Dict]:
+        """Per-name calls / total / mean / max ms, slowest total first."""
+        with self._lock:
+            events = list(self.events)
+        rows: Dict[str, Dict] = {}
+        for e in events:
+            r = rows.setdefault(e["name"], {"name": e["name"], "calls": 0,
+                                            "total_ms": 0.0, "max_ms": 0.0})
+            r["calls"]    += 1
+            r["total_ms"] += e["ms"]
+            r["max_ms"]    = max(r["max_ms"], e["ms"])
+        for r in rows.values():
+            r["mean_ms"] = r["total_ms"] / r["calls"]
+        return sorted(rows.values(), key=lambda r: -r["total_ms"])
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["start_ms"])
+        return {"label":      self.label,
+                "started":    self.started,
+                "elapsed_ms": self.elapsed_ms,
+                "summary":    self.summary(),
+                "events":     events}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+
+def active_tracer() -> Optional[Tracer]:
+    return _ACTIVE.get()
+
+
+def span(name: str, **meta):
+    """Span on the active tracer, or a no-op context when there is none."""
+    tracer = _ACTIVE.get()
+    return tracer.span(name, **meta) if tracer is not None else nullcontext()
+
+
+def traced(fn: Optional[Callable] = None, *, name: Optional[str] = None):
+    """Decorator: time every call of `fn` on the active tracer, if any."""
+    def decorate(f: Callable) -> Callable:
+        label = name or f.__name__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            tracer = _ACTIVE.get()
+            if tracer is None:
+                return f(*args, **kwargs)
+            with tracer.span(label):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorate(fn) if fn is not None else decorate
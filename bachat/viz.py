@@ -0,0 +1,737 @@
+"""
+BACHAT KOMMITTEE — visualization layer.
+
+Brand palette, number formatting, insight text and the plotly chart builders
+used by the Streamlit app.  Each chart_* function is pure: data in, go.Figure
+out.
+Loaded lazily (``bachat.viz``) so engine-only users never import plotly.
+"""
+
+import dataclasses
+
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from typing import Dict, List, Optional
+
+from .engine import (
+    BachatConfig, ForecastAggregates, _agg_monthly,
+    cycle_economics, solve_breakeven,
+)
+from .trace import traced
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+BACHAT_GREEN       = "#00D084"
+BACHAT_GREEN_DARK  = "#00A368"
+BACHAT_GREEN_LIGHT = "#E6F9F1"
+INK        = "#0F172A"
+SLATE_700  = "#334155"
+SLATE_500  = "#64748B"
+SLATE_300  = "#CBD5E1"
+SLATE_200  = "#E2E8F0"
+SLATE_100  = "#F1F5F9"
+SLATE_50   = "#F8FAFC"
+DANGER     = "#DC2626"
+WARNING    = "#F59E0B"
+INFO       = "#0EA5E9"
+PURPLE     = "#8B5CF6"
+TEAL       = "#14B8A6"
+WHITE      = "#FFFFFF"
+
+PLOTLY_TEMPLATE = "plotly_white"
+PLOTLY_COLORWAY = [BACHAT_GREEN, INFO, PURPLE, WARNING, DANGER, TEAL]
+
+
+# =============================================================================
+# FORMATTING
+# =============================================================================
+
+def fmt_pkr(x: float) -> str:
+    if pd.isna(x) or x == 0:
+        return "—"
+    s = "-" if x < 0 else ""
+    x = abs(x)
+    if x >= 1e9:  return f"{s}PKR {x/1e9:.2f}B"
+    if x >= 1e6:  return f"{s}PKR {x/1e6:.2f}M"
+    if x >= 1e3:  return f"{s}PKR {x/1e3:.1f}k"
+    return f"{s}PKR {x:,.0f}"
+
+
+def _hex_rgba(hex_color: str, alpha: float = 0.18) -> str:
+    h = hex_color.lstrip("#")
+    r, g, b = int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+    return f"rgba({r},{g},{b},{alpha})"
+
+
+# =============================================================================
+# SMART INSIGHTS
+# =============================================================================
+
+_INSIGHT_TOTALS = ("pre_payout_loss_monthly", "post_payout_loss_monthly",
+                   "total_revenue_monthly", "returning_users", "new_users")
+
+
+@traced
+def generate_insights(cfg: BachatConfig, df: pd.DataFrame,
+                      aggs: Optional[ForecastAggregates] = None) -> List[str]:
+    if aggs is not None:
+        agg, totals = aggs.monthly, aggs.totals
+        yearly = aggs.yearly.rename(columns={"total_revenue_monthly": "revenue"})
+    else:
+        # Only the figures read below — not the whole aggregate bundle.
+        agg    = df.groupby("month")[["net_profit_monthly"]].sum().reset_index()
+        yearly = (df.groupby("year")[["total_revenue_monthly"]].sum().reset_index()
+                    .rename(columns={"total_revenue_monthly": "revenue"}))
+        totals = {c: df[c].sum() for c in _INSIGHT_TOTALS}
+
+    eco         = cycle_economics(cfg, cfg.durations[0])
+    annual_rate = cfg.kibor_rate + cfg.spread
+    insights    = []
+
+    # 1 — peak profit month
+    peak_idx = agg["net_profit_monthly"].idxmax()
+    peak_m   = int(agg.loc[peak_idx, "month"])
+    peak_v   = agg.loc[peak_idx, "net_profit_monthly"]
+    insights.append(
+        f"Peak monthly profit of <b>{fmt_pkr(peak_v)}</b> reached in "
+        f"Month {peak_m} (Year {((peak_m-1)//12)+1})."
+    )
+
+    # 2 — Y1 → Y2 revenue growth
+    if len(yearly) >= 2:
+        y1 = yearly.loc[yearly["year"]==1, "revenue"].values[0]
+        y2 = yearly.loc[yearly["year"]==2, "revenue"].values[0]
+        g  = (y2 - y1) / y1 * 100 if y1 else 0
+        insights.append(
+            f"Revenue grows <b>{g:+.1f}%</b> from Year 1 to Year 2 "
+            f"({fmt_pkr(y1)} → {fmt_pkr(y2)})."
+        )
+
+    # 3 — float capture
+    insights.append(
+        f"Platform captures <b>{fmt_pkr(eco['avg_float_outstanding'])}</b> avg float "
+        f"per cycle via {eco['blocked_slots']} blocked slot(s), earning "
+        f"<b>{fmt_pkr(eco['float_nii'])}</b> NII/cycle at {annual_rate:.1f}%."
+    )
+
+    # 4 — breakeven default rate
+    be = float(solve_breakeven(cfg, "default_rate",
+                               cfg.durations[0], cfg.slab_amounts[0]))
+    if np.isfinite(be):
+        safety = be - cfg.default_rate
+        insights.append(
+            f"Breakeven default rate: <b>{be:.1f}%</b>. "
+            f"Current {cfg.default_rate:.0f}% leaves a "
+            f"<b>{safety:.1f} ppt safety margin</b>."
+        )
+    elif cycle_economics(dataclasses.replace(cfg, default_rate=0.0),
+                         cfg.durations[0], cfg.slab_amounts[0])["net_profit"] < 0:
+        insights.append(
+            f"No breakeven default rate: a {cfg.durations[0]}M cycle is "
+            f"<b>unprofitable even at 0% defaults</b>."
+        )
+
+    # 5 — default split
+    total_pre  = totals["pre_payout_loss_monthly"]
+    total_post = totals["post_payout_loss_monthly"]
+    total_loss = total_pre + total_post
+    total_rev  = totals["total_revenue_monthly"]
+    loss_pct   = total_loss / total_rev * 100 if total_rev else 0
+    insights.append(
+        f"Default losses consume <b>{loss_pct:.1f}%</b> of revenue "
+        f"({fmt_pkr(total_loss)}): "
+        f"<b>{fmt_pkr(total_pre)}</b> pre-payout (operational) + "
+        f"<b>{fmt_pkr(total_post)}</b> post-payout (credit)."
+    )
+
+    # 6 — returning-user share
+    total_ret = totals["returning_users"]
+    total_new = totals["new_users"]
+    total_all = total_new + total_ret
+    if total_all > 0:
+        ret_pct = total_ret / total_all * 100
+        insights.append(
+            f"Returning users are <b>{ret_pct:.0f}%</b> of total activity "
+            f"({total_ret:,} of {total_all:,}) — "
+            f"driven by {cfg.returning_user_rate:.0f}% return rate."
+        )
+
+    return insights
+
+
+# =============================================================================
+# VIZ HELPERS
+# =============================================================================
+
+_CFG_STATIC = {"displayModeBar": False}
+
+
+def _theme(fig: go.Figure, title: str = "", height: int = 380) -> go.Figure:
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=14, color=INK, family="Inter"),
+                   x=0.0, xanchor="left", pad=dict(b=8)),
+        template=PLOTLY_TEMPLATE,
+        font=dict(family="Inter", size=12, color=SLATE_700),
+        colorway=PLOTLY_COLORWAY,
+        height=height,
+        margin=dict(l=16, r=16, t=48, b=36),
+        plot_bgcolor=WHITE, paper_bgcolor=WHITE,
+        xaxis=dict(gridcolor=SLATE_100, linecolor=SLATE_200, zeroline=False),
+        yaxis=dict(gridcolor=SLATE_100, linecolor=SLATE_200, zeroline=False),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02,
+                    xanchor="right", x=1.0, font=dict(size=11)),
+        hovermode="x unified",
+    )
+    return fig
+
+
+# =============================================================================
+# CHART FUNCTIONS
+# =============================================================================
+
+def _fmt_short(x: float, is_currency: bool = True) -> str:
+    """Compact human-readable format for sparkline annotations."""
+    if x == 0:
+        return "0"
+    s = "-" if x < 0 else ""
+    x = abs(x)
+    if is_currency:
+        if x >= 1e9:  return f"{s}PKR {x/1e9:.1f}B"
+        if x >= 1e6:  return f"{s}PKR {x/1e6:.1f}M"
+        if x >= 1e3:  return f"{s}PKR {x/1e3:.0f}k"
+        return f"{s}PKR {x:,.0f}"
+    if x >= 1e6:  return f"{s}{x/1e6:.2f}M"
+    if x >= 1e3:  return f"{s}{x/1e3:.1f}k"
+    return f"{s}{x:,.0f}"
+
+
+@traced
+def chart_kpi_sparklines(agg: pd.DataFrame) -> go.Figure:
+    """4-panel sparkline cards — each shows a title, formatted value, delta %, and area chart."""
+    metrics = [
+        ("total_revenue_monthly", "Monthly Revenue", BACHAT_GREEN, True),
+        ("net_profit_monthly",    "Net Profit",      INFO,         True),
+        ("active_users",          "Active Users",    PURPLE,       False),
+        ("default_loss_monthly",  "Default Loss",    DANGER,       True),
+    ]
+
+    fig = make_subplots(
+        rows=1, cols=4,
+        horizontal_spacing=0.06,
+    )
+
+    annotations = []
+    for col_idx, (col, label, color, is_currency) in enumerate(metrics, 1):
+        y = agg[col].values if col in agg.columns else np.zeros(len(agg))
+        latest = y[-1] if len(y) else 0
+        prev   = y[-2] if len(y) > 1 else latest
+        delta  = ((latest - prev) / prev * 100) if prev != 0 else 0
+        headline = _fmt_short(latest, is_currency)
+        delta_sign = "+" if delta >= 0 else ""
+        delta_color = (BACHAT_GREEN if col != "default_loss_monthly" else DANGER) if delta >= 0 else (DANGER if col != "default_loss_monthly" else BACHAT_GREEN)
+
+        fig.add_trace(go.Scatter(
+            x=agg["month"], y=y, mode="lines",
+            line=dict(color=color, width=2.5, shape="spline"),
+            fill="tozeroy",
+            fillcolor=_hex_rgba(color, 0.10),
+            showlegend=False,
+            hovertemplate=f"<b>{label}</b><br>"
+                          "Month %{x}<br>"
+                          f"Value: %{{y:,.0f}}<extra></extra>",
+        ), row=1, col=col_idx)
+
+        x_ref = f"x{col_idx} domain" if col_idx > 1 else "x domain"
+        y_ref = f"y{col_idx} domain" if col_idx > 1 else "y domain"
+        annotations.append(dict(
+            text=f"<b style='color:{SLATE_500};font-size:11px'>{label}</b>",
+            x=0.02, y=1.18, xref=x_ref, yref=y_ref,
+            showarrow=False, xanchor="left", font=dict(size=11),
+        ))
+        annotations.append(dict(
+            text=f"<b style='color:{INK};font-size:17px'>{headline}</b>"
+                 f"  <span style='color:{delta_color};font-size:11px'>{delta_sign}{delta:.1f}%</span>",
+            x=0.02, y=1.02, xref=x_ref, yref=y_ref,
+            showarrow=False, xanchor="left", font=dict(size=17),
+        ))
+
+    for ax_key in list(fig.layout.to_plotly_json()):
+        if ax_key.startswith("xaxis") or ax_key.startswith("yaxis"):
+            fig.layout[ax_key].update(showgrid=False, showticklabels=False,
+                                      zeroline=False, showline=False)
+
+    fig.update_layout(
+        height=180, margin=dict(l=8, r=8, t=60, b=8),
+        template=PLOTLY_TEMPLATE, paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+        showlegend=False,
+        annotations=annotations,
+    )
+    return fig
+
+
+@traced
+def chart_revenue_combo(agg: pd.DataFrame) -> go.Figure:
+    """Combo bar+line: stacked revenue components + net profit line."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    components = [
+        ("fees_monthly",           "Fees",         BACHAT_GREEN),
+        ("base_nii_monthly",       "Base NII",     INFO),
+        ("float_nii_monthly",      "Float NII",    PURPLE),
+        ("fee_nii_monthly",        "Fee NII",      TEAL),
+        ("penalty_income_monthly", "Penalty",      WARNING),
+    ]
+    for col, name, color in components:
+        if col in agg.columns:
+            fig.add_trace(go.Bar(x=agg["month"], y=agg[col], name=name,
+                                 marker_color=color, opacity=0.85), secondary_y=False)
+    fig.add_trace(
+        go.Scatter(x=agg["month"], y=agg["net_profit_monthly"],
+                   name="Net Profit", mode="lines",
+                   line=dict(color=DANGER, width=2.5, dash="solid"),
+                   showlegend=True),
+        secondary_y=True,
+    )
+    fig.update_layout(barmode="stack", height=400,
+                      margin=dict(l=16, r=16, t=48, b=36),
+                      template=PLOTLY_TEMPLATE, paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02,
+                                  xanchor="right", x=1.0, font=dict(size=11)),
+                      hovermode="x unified")
+    fig.update_yaxes(title_text="Revenue (PKR)", secondary_y=False,
+                     gridcolor=SLATE_100)
+    fig.update_yaxes(title_text="Net Profit (PKR)", secondary_y=True,
+                     gridcolor=SLATE_100)
+    fig.update_layout(title=dict(
+        text="Revenue Components vs Net Profit",
+        font=dict(size=14, color=INK), x=0.0, xanchor="left"))
+    return fig
+
+
+@traced
+def chart_deposits_cumulative(agg: pd.DataFrame) -> go.Figure:
+    """Stacked area: cumulative user deposits + platform capital vs total pot turnover."""
+    contrib = agg["user_contributions_monthly"].values if "user_contributions_monthly" in agg.columns else np.zeros(len(agg))
+    plat = agg["platform_capital_monthly"].values if "platform_capital_monthly" in agg.columns else np.zeros(len(agg))
+    disbursed = agg["pot_disbursed_monthly"].values if "pot_disbursed_monthly" in agg.columns else np.zeros(len(agg))
+
+    cum_user = np.cumsum(contrib)
+    cum_plat = np.cumsum(plat)
+    cum_dis  = np.cumsum(disbursed)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=cum_dis, name="Total Pot Turnover",
+        mode="lines", line=dict(color=PURPLE, width=2.5, shape="spline"),
+        fill="tozeroy", fillcolor=_hex_rgba(PURPLE, 0.08),
+        hovertemplate="Month %{x}<br>Pot Turnover: %{y:,.0f}<extra></extra>",
+    ))
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=cum_user, name="User Deposits",
+        mode="lines", line=dict(color=BACHAT_GREEN, width=2.5, shape="spline"),
+        fill="tozeroy", fillcolor=_hex_rgba(BACHAT_GREEN, 0.12),
+        hovertemplate="Month %{x}<br>User Deposits: %{y:,.0f}<extra></extra>",
+    ))
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=cum_plat, name="Platform Capital",
+        mode="lines", line=dict(color=WARNING, width=2, dash="dash", shape="spline"),
+        hovertemplate="Month %{x}<br>Platform Capital: %{y:,.0f}<extra></extra>",
+    ))
+    return _theme(fig, "Cumulative Deposits vs Pot Turnover", height=380)
+
+
+@traced
+def chart_deposits_monthly(agg: pd.DataFrame) -> go.Figure:
+    """Stacked bar: user deposits + platform capital, with pot turnover line."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    contrib = agg["user_contributions_monthly"] if "user_contributions_monthly" in agg.columns else pd.Series(np.zeros(len(agg)))
+    plat = agg["platform_capital_monthly"] if "platform_capital_monthly" in agg.columns else pd.Series(np.zeros(len(agg)))
+    disbursed = agg["pot_disbursed_monthly"] if "pot_disbursed_monthly" in agg.columns else pd.Series(np.zeros(len(agg)))
+
+    fig.add_trace(go.Bar(
+        x=agg["month"], y=contrib, name="User Deposits",
+        marker_color=BACHAT_GREEN, opacity=0.85,
+        hovertemplate="Month %{x}<br>User Deposits: %{y:,.0f}<extra></extra>",
+    ), secondary_y=False)
+    fig.add_trace(go.Bar(
+        x=agg["month"], y=plat, name="Platform Capital",
+        marker_color=WARNING, opacity=0.70,
+        hovertemplate="Month %{x}<br>Platform Capital: %{y:,.0f}<extra></extra>",
+    ), secondary_y=False)
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=disbursed, name="Pot Turnover",
+        mode="lines",
+        line=dict(color=PURPLE, width=2.5),
+        hovertemplate="Month %{x}<br>Pot Turnover: %{y:,.0f}<extra></extra>",
+    ), secondary_y=True)
+    fig.update_layout(
+        barmode="stack", height=400,
+        margin=dict(l=16, r=16, t=48, b=36),
+        template=PLOTLY_TEMPLATE, paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02,
+                    xanchor="right", x=1.0, font=dict(size=11)),
+        hovermode="x unified",
+        title=dict(text="Monthly Deposits & Platform Capital",
+                   font=dict(size=14, color=INK), x=0.0, xanchor="left"),
+    )
+    fig.update_yaxes(title_text="Amount (PKR)", secondary_y=False, gridcolor=SLATE_100)
+    fig.update_yaxes(title_text="Pot Turnover (PKR)", secondary_y=True, gridcolor=SLATE_100)
+    return fig
+
+
+@traced
+def chart_float_timeline(agg: pd.DataFrame) -> go.Figure:
+    """Area chart of platform float outstanding over time."""
+    flt = agg["float_outstanding_monthly"] if "float_outstanding_monthly" in agg.columns else pd.Series(np.zeros(len(agg)))
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=flt, name="Float Outstanding",
+        mode="lines", line=dict(color=TEAL, width=2.5, shape="spline"),
+        fill="tozeroy", fillcolor=_hex_rgba(TEAL, 0.12),
+        hovertemplate="Month %{x}<br>Float: %{y:,.0f}<extra></extra>",
+    ))
+    return _theme(fig, "Platform Float Outstanding", height=320)
+
+
+@traced
+def chart_profit_gauge(cfg: BachatConfig) -> go.Figure:
+    """Four horizontal gauge indicators: margin, loss, profit/user, float ROI."""
+    eco      = cycle_economics(cfg, cfg.durations[0])
+    margin   = eco["net_profit"] / eco["total_revenue"] * 100 if eco["total_revenue"] else 0
+    loss_pct = eco["net_default"] / eco["total_revenue"] * 100 if eco["total_revenue"] else 0
+    profit_per_user = eco["net_profit"] / eco["user_slots"] if eco["user_slots"] else 0
+    float_roi = (eco["net_profit"] / eco["avg_float_outstanding"] * 100
+                 if eco["avg_float_outstanding"] else 0)
+
+    m_color = BACHAT_GREEN if margin > 30 else (WARNING if margin > 0 else DANGER)
+    l_color = BACHAT_GREEN if loss_pct < 8 else (WARNING if loss_pct < 20 else DANGER)
+
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[[{"type": "indicator"}] * 2] * 2,
+        horizontal_spacing=0.12,
+        vertical_spacing=0.25,
+    )
+
+    indicators = [
+        ("Net Margin",     round(margin, 1),         "%",  m_color, [-20, 80],  0,   1, 1),
+        ("Loss / Revenue", round(loss_pct, 1),       "%",  l_color, [0, 50],   20,   1, 2),
+        ("Profit / User",  round(profit_per_user, 0), "",  INFO,    [0, max(profit_per_user * 2, 1000)], None, 2, 1),
+        ("Float ROI",      round(float_roi, 1),      "%",  PURPLE,  [0, max(float_roi * 2, 100)], None, 2, 2),
+    ]
+
+    for title, val, suffix, color, axis_range, threshold, row, col in indicators:
+        gauge_cfg = {
+            "axis": {"range": axis_range,
+                     "tickfont": {"size": 10, "color": SLATE_300},
+                     "dtick": (axis_range[1] - axis_range[0]) / 4},
+            "bar": {"color": color, "thickness": 0.6},
+            "bgcolor": SLATE_100,
+            "borderwidth": 0,
+            "shape": "bullet",
+        }
+        if threshold is not None:
+            gauge_cfg["threshold"] = {
+                "line": {"color": SLATE_500, "width": 2},
+                "thickness": 0.85, "value": threshold,
+            }
+            gauge_cfg["steps"] = [
+                {"range": [axis_range[0], threshold], "color": _hex_rgba(color, 0.08)},
+                {"range": [threshold, axis_range[1]], "color": _hex_rgba(SLATE_300, 0.10)},
+            ]
+
+        fig.add_trace(go.Indicator(
+            mode="gauge+number",
+            value=val,
+            title={"text": f"<b>{title}</b>",
+                   "font": {"size": 13, "color": SLATE_500, "family": "Inter"}},
+            number={"suffix": suffix,
+                    "font": {"size": 26, "color": color, "family": "Inter"},
+                    "valueformat": ",.1f" if suffix == "%" else ",.0f"},
+            gauge=gauge_cfg,
+        ), row=row, col=col)
+
+    fig.update_layout(
+        height=260, margin=dict(l=24, r=24, t=28, b=16),
+        paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+    )
+    return fig
+
+
+@traced
+def chart_income_statement(eco: Dict) -> go.Figure:
+    """Horizontal waterfall-style income statement."""
+    labels = ["Fees", "Base NII", "Float NII", "Fee NII", "Penalty",
+              "Gross Revenue", "Default Loss", "Net Profit"]
+    values = [eco["fees"], eco["base_nii"], eco["float_nii"],
+              eco["fee_nii"], eco["penalty_income"],
+              eco["total_revenue"], -eco["net_default"],
+              eco["net_profit"]]
+    colors = [BACHAT_GREEN, INFO, PURPLE, TEAL, WARNING,
+              BACHAT_GREEN_DARK, DANGER,
+              BACHAT_GREEN if eco["net_profit"] >= 0 else DANGER]
+
+    fig = go.Figure(go.Bar(
+        x=values, y=labels, orientation="h",
+        marker_color=colors, text=[fmt_pkr(v) for v in values],
+        textposition="outside", textfont=dict(size=11),
+    ))
+    fig.update_layout(
+        height=340, margin=dict(l=8, r=60, t=32, b=8),
+        template=PLOTLY_TEMPLATE, paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+        xaxis=dict(showgrid=True, gridcolor=SLATE_100, zeroline=True,
+                   zerolinecolor=SLATE_300),
+        yaxis=dict(autorange="reversed"),
+        title=dict(text="Cycle Income Statement (per group)",
+                   font=dict(size=13, color=INK), x=0.0),
+    )
+    return fig
+
+
+@traced
+def chart_default_split(agg: pd.DataFrame) -> go.Figure:
+    """Stacked bar: pre vs post payout default loss over time."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=agg["month"], y=agg.get("pre_payout_loss_monthly", 0),
+        name="Pre-Payout (Operational)", marker_color=WARNING))
+    fig.add_trace(go.Bar(
+        x=agg["month"], y=agg.get("post_payout_loss_monthly", 0),
+        name="Post-Payout (Credit)", marker_color=DANGER))
+    fig.update_layout(barmode="stack")
+    return _theme(fig, "Default Loss: Pre vs Post Payout", height=380)
+
+
+@traced
+def chart_loss_fan(sim_frame: pd.DataFrame) -> go.Figure:
+    """Monte Carlo loss band: mean and 95/99% VaR against the deterministic loss."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=sim_frame["month"], y=sim_frame["default_loss_var_99"],
+        name="99% VaR", mode="lines", line=dict(color=DANGER, width=1.5)))
+    fig.add_trace(go.Scatter(
+        x=sim_frame["month"], y=sim_frame["default_loss_var_95"],
+        name="95% VaR", mode="lines", line=dict(color=WARNING, width=1.5),
+        fill="tonexty", fillcolor=_hex_rgba(DANGER, 0.10)))
+    fig.add_trace(go.Scatter(
+        x=sim_frame["month"], y=sim_frame["default_loss_mean"],
+        name="Simulated Mean", mode="lines", line=dict(color=INFO, width=2.5),
+        fill="tonexty", fillcolor=_hex_rgba(WARNING, 0.10)))
+    fig.add_trace(go.Scatter(
+        x=sim_frame["month"], y=sim_frame["default_loss_expected"],
+        name="Deterministic", mode="lines",
+        line=dict(color=SLATE_500, width=1.5, dash="dash")))
+    fig.update_yaxes(title_text="Net Default Loss (PKR / month)")
+    return _theme(fig, "Monthly Default Loss — Monte Carlo Band", height=380)
+
+
+@traced
+def chart_user_waterfall(agg: pd.DataFrame) -> go.Figure:
+    """Area chart: new, returning, active users over time."""
+    fig = go.Figure()
+    for col, name, color in [
+        ("active_users",    "Active",    BACHAT_GREEN),
+        ("new_users",       "New",       INFO),
+        ("returning_users", "Returning", PURPLE),
+        ("churned_users",   "Churned",   DANGER),
+    ]:
+        if col in agg.columns:
+            fig.add_trace(go.Scatter(
+                x=agg["month"], y=agg[col], name=name, mode="lines",
+                line=dict(color=color, width=2),
+                fill="tozeroy" if col == "active_users" else "none",
+                fillcolor=_hex_rgba(color, 0.08)))
+    return _theme(fig, "User Lifecycle", height=380)
+
+
+@traced
+def chart_scenario_comparison(scenarios: Dict[str, pd.DataFrame]) -> go.Figure:
+    """Line chart comparing net profit across Base/Optimistic/Pessimistic."""
+    colors = {"Base": INFO, "Optimistic": BACHAT_GREEN, "Pessimistic": DANGER}
+    fig = go.Figure()
+    for name, df in scenarios.items():
+        agg = _agg_monthly(df)
+        fig.add_trace(go.Scatter(
+            x=agg["month"], y=agg["net_profit_monthly"],
+            name=name, mode="lines",
+            line=dict(color=colors.get(name, SLATE_500), width=2.5,
+                      dash="solid" if name == "Base" else
+                           "dot" if name == "Optimistic" else "dash")))
+    fig.add_hline(y=0, line=dict(color=SLATE_300, width=1, dash="dot"))
+    return _theme(fig, "Scenario Comparison — Monthly Net Profit", height=400)
+
+
+@traced
+def chart_scenario_revenue(scenarios: Dict[str, pd.DataFrame]) -> go.Figure:
+    """Bar chart of total revenue per scenario per year."""
+    colors = {"Base": INFO, "Optimistic": BACHAT_GREEN, "Pessimistic": DANGER}
+    fig = go.Figure()
+    for name, df in scenarios.items():
+        yearly = df.groupby("year")["total_revenue_monthly"].sum().reset_index()
+        fig.add_trace(go.Bar(
+            x=yearly["year"], y=yearly["total_revenue_monthly"],
+            name=name, marker_color=colors.get(name, SLATE_500)))
+    fig.update_layout(barmode="group")
+    return _theme(fig, "Annual Revenue by Scenario", height=380)
+
+
+@traced
+def chart_market_funnel(cfg: BachatConfig, df: pd.DataFrame) -> go.Figure:
+    """TAM / SAM / SOM funnel with simulated user penetration."""
+    sim_users = int(df["active_users"].max()) if "active_users" in df.columns else 0
+    fig = go.Figure(go.Funnel(
+        y=["TAM", "SAM", "SOM", "Simulated Peak"],
+        x=[cfg.market_size, cfg.sam_size, cfg.som_size, sim_users],
+        textinfo="value+percent initial",
+        marker=dict(color=[SLATE_300, INFO, BACHAT_GREEN, BACHAT_GREEN_DARK]),
+        connector=dict(line=dict(color=SLATE_200, width=1)),
+    ))
+    fig.update_layout(height=340, margin=dict(l=16, r=16, t=48, b=8),
+                      paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+                      title=dict(text="Market Penetration Funnel",
+                                 font=dict(size=14, color=INK), x=0.0))
+    return fig
+
+
+@traced
+def chart_market_growth(cfg: BachatConfig) -> go.Figure:
+    """Projected TAM/SAM/SOM growth over 5 years."""
+    years = list(range(1, 6))
+    g     = cfg.market_growth_rate / 100.0
+    fig   = go.Figure()
+    for name, base, color in [
+        ("TAM", cfg.market_size, SLATE_300),
+        ("SAM", cfg.sam_size,    INFO),
+        ("SOM", cfg.som_size,    BACHAT_GREEN),
+    ]:
+        vals = [base * (1 + g) ** (y - 1) for y in years]
+        fig.add_trace(go.Scatter(x=years, y=vals, name=name, mode="lines+markers",
+                                 line=dict(color=color, width=2.5)))
+    return _theme(fig, f"Market Size Projection ({cfg.market_growth_rate:.0f}% p.a.)",
+                  height=340)
+
+
+@traced
+def chart_yoy_projection(proj: pd.DataFrame) -> go.Figure:
+    """Bar + line: actual vs projected revenue and profit YoY."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    sim  = proj[proj["source"] == "Simulated"]
+    ext  = proj[proj["source"] == "Projected"]
+
+    fig.add_trace(go.Bar(x=sim["year"], y=sim["revenue"],
+                         name="Revenue (Simulated)", marker_color=BACHAT_GREEN,
+                         opacity=0.85), secondary_y=False)
+    fig.add_trace(go.Bar(x=ext["year"], y=ext["revenue"],
+                         name="Revenue (Projected)", marker_color=BACHAT_GREEN,
+                         opacity=0.45, marker_pattern_shape="/"), secondary_y=False)
+    fig.add_trace(go.Scatter(x=proj["year"], y=proj["profit"],
+                             name="Net Profit", mode="lines+markers",
+                             line=dict(color=INFO, width=2.5)), secondary_y=True)
+    fig.update_layout(barmode="group", height=380,
+                      margin=dict(l=16, r=16, t=48, b=36),
+                      template=PLOTLY_TEMPLATE, paper_bgcolor=WHITE, plot_bgcolor=WHITE,
+                      hovermode="x unified",
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02,
+                                  xanchor="right", x=1.0),
+                      title=dict(text="YoY Revenue & Profit (Simulated + Projected)",
+                                 font=dict(size=14, color=INK), x=0.0))
+    fig.update_yaxes(title_text="Revenue (PKR)", secondary_y=False,
+                     gridcolor=SLATE_100)
+    fig.update_yaxes(title_text="Net Profit (PKR)", secondary_y=True)
+    return fig
+
+
+@traced
+def chart_profit_split_area(agg: pd.DataFrame) -> go.Figure:
+    """Stacked area: Party A vs Party B net profit share over time."""
+    party_a = agg["party_a_monthly"]
+    party_b = agg["party_b_monthly"]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=party_a,
+        name="Party A (Platform)", mode="lines",
+        line=dict(color=BACHAT_GREEN, width=0),
+        fill="tozeroy", fillcolor=_hex_rgba(BACHAT_GREEN, 0.55),
+        stackgroup="split",
+    ))
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=party_b,
+        name="Party B (Investors)", mode="lines",
+        line=dict(color=INFO, width=0),
+        fill="tonexty", fillcolor=_hex_rgba(INFO, 0.45),
+        stackgroup="split",
+    ))
+    # Net profit line on top
+    fig.add_trace(go.Scatter(
+        x=agg["month"], y=agg["net_profit_monthly"],
+        name="Net Profit (total)", mode="lines",
+        line=dict(color=INK, width=2, dash="dot"),
+    ))
+    return _theme(fig, "Party A vs Party B — Monthly Profit Split", height=360)
+
+
+@traced
+def chart_profit_split_donut(party_a: float, party_b: float,
+                              pct_a: float) -> go.Figure:
+    """Donut focused purely on profit split between the two parties."""
+    pct_b = 100 - pct_a
+    colors = [BACHAT_GREEN, INFO]
+    fig = go.Figure(go.Pie(
+        labels=[f"Party A  ({pct_a:.0f}%)", f"Party B  ({pct_b:.0f}%)"],
+        values=[max(0, party_a), max(0, party_b)],
+        hole=0.62,
+        marker=dict(colors=colors,
+                    line=dict(color=WHITE, width=3)),
+        textinfo="label+value",
+        texttemplate="%{label}<br><b>%{value:,.0f}</b>",
+        textfont=dict(size=11, color=INK),
+        insidetextorientation="horizontal",
+        pull=[0.04, 0],
+        direction="clockwise",
+        sort=False,
+    ))
+    fig.update_layout(
+        height=280,
+        margin=dict(l=8, r=8, t=40, b=8),
+        paper_bgcolor=WHITE,
+        showlegend=False,
+        title=dict(text="Cumulative Profit Split",
+                   font=dict(size=13, color=INK), x=0.5, xanchor="center"),
+        annotations=[dict(
+            text=f"<b>{pct_a:.0f}% / {pct_b:.0f}%</b>",
+            x=0.5, y=0.5, showarrow=False,
+            font=dict(size=16, color=INK, family="Inter"),
+        )],
+    )
+    return fig
+
+
+@traced
+def chart_profit_split_yearly(yearly_agg: pd.DataFrame,
+                              cfg: BachatConfig) -> go.Figure:
+    """Grouped bar — Party A vs B profit per year (from ForecastAggregates.yearly)."""
+    yearly = yearly_agg.rename(columns={"party_a_monthly": "party_a",
+                                        "party_b_monthly": "party_b"})
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=yearly["year"], y=yearly["party_a"],
+        name=f"Party A ({cfg.profit_split_party_a:.0f}%)",
+        marker_color=BACHAT_GREEN,
+        text=[fmt_pkr(v) for v in yearly["party_a"]],
+        textposition="outside", textfont=dict(size=10),
+    ))
+    fig.add_trace(go.Bar(
+        x=yearly["year"], y=yearly["party_b"],
+        name=f"Party B ({100-cfg.profit_split_party_a:.0f}%)",
+        marker_color=INFO,
+        text=[fmt_pkr(v) for v in yearly["party_b"]],
+        textposition="outside", textfont=dict(size=10),
+    ))
+    fig.update_layout(barmode="group")
+    fig.update_xaxes(title_text="Year", tickmode="linear")
+    fig.update_yaxes(title_text="Profit (PKR)")
+    return _theme(fig, "Annual Profit by Party", height=360)
@@ -0,0 +1,158 @@
+"""
+Streaming multi-sheet Excel export of the ultimate model.
+
+    write_workbook("bachat.xlsx", cfg, scenarios=build_scenarios(cfg))
+
+Uses xlsxwriter's constant_memory mode: every row is flushed to a temp file
+as soon as the next one starts, and rows are fed from column arrays a chunk
+at a time, so memory stays flat whatever the row count.  Scenarios may be a
+generator of (name, frame) pairs, letting a long sweep be computed and
+written one forecast at a time.  Sheets that outgrow Excel's row limit
+continue on "<name> (2)", "<name> (3)", ...
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from .engine import (
+    BachatConfig, build_forecast, build_slot_table, build_yearly_projection,
+    config_to_dict, cycle_economics,
+)
+
+XLSX_MIME    = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXCEL_ROWS   = 1_048_576          # per sheet, header included
+CHUNK_ROWS   = 4_096
+
+ScenarioFrames = Union[Dict[str, pd.DataFrame], Iterable[Tuple[str, pd.DataFrame]]]
+
+
+# =============================================================================
+# SHEET WRITER
+# =============================================================================
+
+class _SheetWriter:
+    """Appends frames to a sheet (spilling to numbered sheets at the row
+    limit), writing rows in order as constant_memory requires."""
+
+    def __init__(self, wb: xlsxwriter.Workbook, name: str, formats: Dict,
+                 max_rows: int = EXCEL_ROWS):
+        self.wb       = wb
+        self.name     = name
+        self.formats  = formats
+        self.max_rows = max_rows
+        self.sheets   = 0
+        self.columns: Optional[List[str]] = None
+        self.col_fmts: List = []
+        self.ws       = None
+        self.row      = 0
+
+    def _new_sheet(self) -> None:
+        self.sheets += 1
+        title   = self.name if self.sheets == 1 else f"{self.name} ({self.sheets})"
+        self.ws = self.wb.add_worksheet(title)
+        for j, (col, fmt) in enumerate(zip(self.columns, self.col_fmts)):
+            self.ws.set_column(j, j, max(10, min(len(col) + 2, 32)), fmt)
+        self.ws.write_row(0, 0, self.columns, self.formats["header"])
+        self.ws.freeze_panes(1, 0)
+        self.row = 1
+
+    def append(self, df: pd.DataFrame, lead: Optional[Tuple[str, object]] = None) -> None:
+        """Write df's rows; `lead` = (column, value) prepends a constant column."""
+        cols   = list(df.columns)
+        arrays = [df[c].to_numpy() for c in cols]
+        if lead is not None:
+            cols   = [lead[0]] + cols
+            arrays = [np.full(len(df), lead[1], dtype=object)] + arrays
+        if self.columns is None:
+            self.columns  = cols
+            self.col_fmts = [self._format_for(a) for a in arrays]
+        elif cols != self.columns:
+            raise ValueError(f"Sheet '{self.name}': column mismatch "
+                             f"({len(cols)} vs {len(self.columns)} columns).")
+        if self.ws is None:
+            self._new_sheet()
+
+        n, start = len(df), 0
+        while start < n:
+            if self.row >= self.max_rows:
+                self._new_sheet()
+            stop  = min(n, start + CHUNK_ROWS, start + self.max_rows - self.row)
+            block = [a[start:stop].tolist() for a in arrays]
+            for values in zip(*block):
+                self.ws.write_row(self.row, 0, values)
+                self.row += 1
+            start = stop
+
+    def _format_for(self, a: np.ndarray):
+        if a.dtype.kind in "iu":
+            return self.formats["int"]
+        if a.dtype.kind == "f":
+            return self.formats["float"]
+        return None
+
+
+# =============================================================================
+# WORKBOOK
+# =============================================================================
+
+def _config_rows(cfg: BachatConfig) -> pd.DataFrame:
+    items = config_to_dict(cfg).items()
+    return pd.DataFrame({
+        "Field": [k for k, _ in items],
+        "Value": [json.dumps(v) if isinstance(v, (dict, list)) else v
+                  for _, v in items],
+    }).astype({"Value": str})
+
+
+def write_workbook(target, cfg: BachatConfig, df: Optional[pd.DataFrame] = None,
+                   scenarios: Optional[ScenarioFrames] = None, yearly: bool = True,
+                   slot_tables: bool = True, economics: bool = True,
+                   max_rows: int = EXCEL_ROWS) -> List[str]:
+    """Write the model workbook to a path or binary file object.
+
+    Sheets: Config, Forecast, Yearly Projection, Scenarios (stacked, with a
+    leading Scenario column), Slot Tables and Cycle Economics (one row per
+    duration × slab).  `df` defaults to build_forecast(cfg).  Returns the
+    sheet names written.
+    """
+    df = build_forecast(cfg) if df is None else df
+    wb = xlsxwriter.Workbook(target, {"constant_memory": True,
+                                      "nan_inf_to_errors": True})
+    formats = {
+        "header": wb.add_format({"bold": True, "bg_color": "#E8F5E9",
+                                 "bottom": 1, "text_wrap": True}),
+        "int":    wb.add_format({"num_format": "#,##0"}),
+        "float":  wb.add_format({"num_format": "#,##0.00"}),
+    }
+
+    def sheet(name: str) -> _SheetWriter:
+        return _SheetWriter(wb, name, formats, max_rows)
+
+    try:
+        sheet("Config").append(_config_rows(cfg))
+        sheet("Forecast").append(df)
+        if yearly:
+            sheet("Yearly Projection").append(build_yearly_projection(df, cfg))
+        if scenarios is not None:
+            out = sheet("Scenarios")
+            pairs = scenarios.items() if isinstance(scenarios, dict) else scenarios
+            for name, sdf in pairs:
+                out.append(sdf, lead=("scenario", name))
+        if slot_tables:
+            out = sheet("Slot Tables")
+            for d in cfg.durations:
+                for s in cfg.slab_amounts:
+                    table = build_slot_table(cfg, d, s)
+                    table.insert(0, "Slab (PKR)", s)
+                    out.append(table, lead=("Duration", d))
+        if economics:
+            sheet("Cycle Economics").append(pd.DataFrame(
+                [cycle_economics(cfg, d, s)
+                 for d in cfg.durations for s in cfg.slab_amounts]))
+    finally:
+        wb.close()
+    return [ws.get_name() for ws in wb.worksheets()]
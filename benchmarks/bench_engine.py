@@ -0,0 +1,230 @@
+"""
+Engine benchmark suite.
+
+Times every hot path over a grid of portfolio sizes and compares against the
+stored baseline (benchmarks/baseline.json):
+
+    python benchmarks/bench_engine.py              # compare, exit 1 on regression
+    python benchmarks/bench_engine.py --save       # record a new baseline
+    python benchmarks/bench_engine.py -k forecast --sizes m,xl
+
+Per case it records
+  wall_ms       best-of-N wall time per call (timeit autorange inside each repeat)
+  peak_kib      tracemalloc peak during one call
+  alloc_blocks  memory blocks still held after one call (tracemalloc snapshot diff;
+                numpy buffers included)
+
+A case regresses when wall_ms grows by more than --threshold (and by more than
+--min-ms absolute, so microsecond paths don't flap) or peak_kib grows by more
+than --mem-threshold.
+"""
+
+import argparse
+import dataclasses
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bachat import (
+    BachatConfig, breakeven_table, build_forecast, build_scenarios,
+    cycle_economics, cycle_economics_batch, user_lifecycle,
+)
+from bachat.viz import generate_insights
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "baseline.json")
+
+DURATION_POOL = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+SLAB_POOL     = [5_000, 10_000, 15_000, 20_000, 25_000, 30_000, 50_000, 100_000]
+
+# name: (n_durations, n_slabs, months)
+SIZES = {
+    "xs": (1,  1,  12),
+    "s":  (3,  2,  36),
+    "m":  (6,  4,  60),
+    "l":  (10, 8, 120),
+    "xl": (10, 8, 240),
+}
+
+
+# =============================================================================
+# CASES
+# =============================================================================
+
+def make_config(n_durations: int, n_slabs: int, months: int) -> BachatConfig:
+    return BachatConfig(durations=DURATION_POOL[:n_durations],
+                        slab_amounts=SLAB_POOL[:n_slabs],
+                        simulation_months=months)
+
+
+def _sensitivity_sweeps(cfg: BachatConfig) -> None:
+    """The cycle_economics_batch calls tab_sensitivity makes per rerun."""
+    slab0 = cfg.slab_amounts[0]
+    cycle_economics_batch(cfg, duration=np.array([3, 6, 9, 12])[:, None],
+                          slab=slab0,
+                          default_rate=np.linspace(0.0, 30.0, 301)[None, :])
+    primary = cfg.durations[0]
+    cycle_economics_batch(cfg, duration=primary, slab=slab0,
+                          blocked=np.arange(0, min(4, primary))[:, None],
+                          slot_fee_pct=np.linspace(0.0, 15.5, 311)[None, :])
+    dur_grid, slab_grid = np.meshgrid(cfg.durations, cfg.slab_amounts,
+                                      indexing="ij")
+    for mode in ("Upfront", "Monthly"):
+        cycle_economics_batch(
+            dataclasses.replace(cfg, fee_collection_mode=mode),
+            dur_grid, slab_grid)
+    breakeven_table(cfg)
+
+
+def _all_lifecycles(cfg: BachatConfig) -> None:
+    for d in cfg.durations:
+        user_lifecycle(cfg, d)
+
+
+def _all_cycle_economics(cfg: BachatConfig) -> None:
+    for d in cfg.durations:
+        for s in cfg.slab_amounts:
+            cycle_economics(cfg, d, s)
+
+
+def build_cases(sizes: List[str]) -> List[Tuple[str, Callable[[], object]]]:
+    """(case_id, zero-arg callable) for every function × size."""
+    cases = []
+    for size in sizes:
+        cfg = make_config(*SIZES[size])
+        df  = build_forecast(cfg)
+        cases += [
+            (f"build_forecast[{size}]",     lambda c=cfg: build_forecast(c)),
+            (f"user_lifecycle[{size}]",     lambda c=cfg: _all_lifecycles(c)),
+            (f"cycle_economics[{size}]",    lambda c=cfg: _all_cycle_economics(c)),
+            (f"build_scenarios[{size}]",    lambda c=cfg: build_scenarios(c)),
+            (f"generate_insights[{size}]",  lambda c=cfg, d=df: generate_insights(c, d)),
+            (f"sensitivity_sweeps[{size}]", lambda c=cfg: _sensitivity_sweeps(c)),
+        ]
+    return cases
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    wall = min(timer.timeit(loops) / loops for _ in range(repeat))
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after  = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(s.count_diff for s in after.compare_to(before, "filename")
+                 if s.count_diff > 0)
+    del result
+    return {"wall_ms":      round(wall * 1e3, 4),
+            "peak_kib":     round(peak / 1024, 1),
+            "alloc_blocks": int(blocks)}
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict],
+            threshold: float, mem_threshold: float,
+            min_ms: float) -> List[str]:
+    """Human-readable regression messages (empty = pass)."""
+    failures = []
+    for case, cur in current.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        dt = cur["wall_ms"] - base["wall_ms"]
+        if dt > min_ms and cur["wall_ms"] > base["wall_ms"] * (1 + threshold):
+            failures.append(f"{case}: wall {base['wall_ms']:.3f} → "
+                            f"{cur['wall_ms']:.3f} ms "
+                            f"(+{dt / base['wall_ms'] * 100:.0f}%)")
+        if (base["peak_kib"] > 0
+                and cur["peak_kib"] > base["peak_kib"] * (1 + mem_threshold)):
+            failures.append(f"{case}: peak {base['peak_kib']:.0f} → "
+                            f"{cur['peak_kib']:.0f} KiB")
+    return failures
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("--save", action="store_true",
+                   help="write results as the new baseline instead of comparing")
+    p.add_argument("--baseline", default=BASELINE_PATH)
+    p.add_argument("--sizes", default=",".join(SIZES),
+                   help=f"comma-separated subset of {', '.join(SIZES)}")
+    p.add_argument("-k", dest="pattern", default="*",
+                   help="only run cases whose id contains this glob")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--threshold", type=float, default=0.25,
+                   help="allowed relative wall-time growth (default 0.25)")
+    p.add_argument("--mem-threshold", type=float, default=0.10,
+                   help="allowed relative peak-memory growth (default 0.10)")
+    p.add_argument("--min-ms", type=float, default=0.05,
+                   help="ignore wall-time growth below this many ms")
+    args = p.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        p.error(f"unknown size(s): {', '.join(unknown)}")
+    pattern = args.pattern if any(ch in args.pattern for ch in "*?[") \
+        else f"*{args.pattern}*"
+
+    results = {}
+    for case, fn in build_cases(sizes):
+        if not fnmatch.fnmatch(case, pattern):
+            continue
+        results[case] = r = measure(fn, args.repeat)
+        print(f"{case:<30} {r['wall_ms']:>10.3f} ms  "
+              f"{r['peak_kib']:>10.1f} KiB  {r['alloc_blocks']:>7,} blocks")
+
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                stored = json.load(fh).get("cases", {})
+        stored.update(results)
+        with open(args.baseline, "w") as fh:
+            json.dump({"meta": {"python":   platform.python_version(),
+                                "numpy":    np.__version__,
+                                "machine":  platform.machine(),
+                                "recorded": time.strftime("%Y-%m-%d")},
+                       "cases": dict(sorted(stored.items()))},
+                      fh, indent=2)
+            fh.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save first")
+        return 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)["cases"]
+    failures = compare(results, baseline, args.threshold,
+                       args.mem_threshold, args.min_ms)
+    for f in failures:
+        print(f"REGRESSION {f}")
+    print(f"{len(results)} case(s), {len(failures)} regression(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
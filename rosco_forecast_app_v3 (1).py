@@ -1,9 +1,10 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import io
 
+from bachat.legacy import V3Config, build_forecast_v3
+
 st.set_page_config(page_title="ROSCA Forecast App v3", layout="wide")
 
 # Sidebar Input_Config
@@ -14,6 +15,11 @@ spread = st.sidebar.slider("Spread (%)", 0.0, 20.0, 5.0, step=0.1)
 default_rate = st.sidebar.slider("Default Rate (%)", 0.0, 10.0, 1.0, step=0.1)
 rest_period = st.sidebar.number_input("Rest Period (months)", min_value=0, max_value=12, value=1)
 fee_upfront = st.sidebar.selectbox("Fee Collected Upfront?", ["Yes", "No"]) == "Yes"
+engine_mode = st.sidebar.selectbox(
+    "Forecast Engine", ["vectorized", "legacy"],
+    format_func=lambda m: {"vectorized": "Vectorized (NumPy)",
+                           "legacy": "Legacy (per-slot loop)"}[m],
+    help="Both produce the identical table; legacy runs the original v3 loop.")
 
 # Year-wise growth rate
 st.sidebar.markdown("### Yearly Monthly Growth Rates (%)")
@@ -36,45 +42,14 @@ slabs = [1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000]
 participation_caps = {3: 3, 4: 2, 5: 1, 6: 1, 8: 1, 10: 1}
 months = 60
 
-# Initialize forecast list
-forecast = []
-
-# Compute monthly growth factor
-monthly_growth_factors = []
-for i in range(months):
-    year_idx = min(i // 12, 4)
-    rate = growth_rates[year_idx] / 100
-    monthly_growth_factors.append((1 + rate) ** (i % 12))
-
 # Forecast model
-for month in range(1, months + 1):
-    month_idx = month - 1
-    tam = initial_tam * monthly_growth_factors[month_idx]
-    for d in durations:
-        users_by_duration = tam * (duration_allocation[d] / 100)
-        per_slab = users_by_duration / len(slabs)
-        for slab in slabs:
-            for slot in range(1, d + 1):
-                fee_pct = slot_fees[slot] / 100
-                deposit = per_slab * slab * d
-                fee_collected = deposit * fee_pct if fee_upfront else 0
-                nii = deposit * ((kibor + spread) / 100 / 12)
-                profit = fee_collected + nii - (deposit * (default_rate / 100))
-                forecast.append({
-                    "Month": month,
-                    "Duration": d,
-                    "Slab": slab,
-                    "Slot": slot,
-                    "Users": per_slab,
-                    "Deposit": deposit,
-                    "Fee %": fee_pct,
-                    "Fee Collected": fee_collected,
-                    "NII": nii,
-                    "Profit": profit
-                })
-
-df = pd.DataFrame(forecast)
-df["Year"] = ((df["Month"] - 1) // 12) + 1
+cfg = V3Config(initial_tam=initial_tam, kibor=kibor, spread=spread,
+               default_rate=default_rate, rest_period=rest_period,
+               fee_upfront=fee_upfront, growth_rates=growth_rates,
+               durations=durations, duration_alloc=duration_allocation,
+               slot_fees=slot_fees, slabs=slabs,
+               participation_caps=participation_caps, months=months)
+df = build_forecast_v3(cfg, mode=engine_mode)
 
 # Yearly summary
 summary = df.groupby("Year")[["Users", "Deposit", "Fee Collected", "NII", "Profit"]].sum().reset_index()
@@ -1,9 +1,10 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import io
 
+from bachat.legacy import V4Config, build_forecast_v4
+
 st.set_page_config(page_title="ROSCA Forecast App v4", layout="wide")
 
 # Sidebar Inputs - Editable Configuration
@@ -15,6 +16,11 @@ kibor = st.sidebar.slider("KIBOR (%)", 0.0, 25.0, 11.0, step=0.1)
 spread = st.sidebar.slider("Spread (%)", 0.0, 20.0, 5.0, step=0.1)
 default_rate = st.sidebar.slider("Default Rate (%)", 0.0, 10.0, 1.0, step=0.1)
 fee_upfront = st.sidebar.selectbox("Fee Collected Upfront?", ["Yes", "No"]) == "Yes"
+engine_mode = st.sidebar.selectbox(
+    "Forecast Engine", ["vectorized", "legacy"],
+    format_func=lambda m: {"vectorized": "Vectorized (NumPy)",
+                           "legacy": "Legacy (per-slot loop)"}[m],
+    help="Both produce the identical table; legacy runs the original v4 loop.")
 
 st.sidebar.markdown("### Yearly Monthly Growth Rates (%)")
 growth_rates = [
@@ -46,50 +52,14 @@ for d in durations:
 # Static Values
 slabs = [1000, 2000, 5000, 10000, 15000, 20000, 25000, 50000]
 months = 60
-users_db = {}
 
 # Forecast Logic
-results = []
-for m in range(1, months + 1):
-    year_idx = (m - 1) // 12
-    monthly_growth = growth_rates[year_idx] / 100
-    tam = initial_tam * ((1 + monthly_growth) ** ((m - 1) % 12))
-
-    for d in durations:
-        duration_users = tam * (duration_alloc[d] / 100)
-        users_per_slab = duration_users / len(slabs)
-
-        for slab in slabs:
-            for slot in range(1, d + 1):
-                fee_pct = slot_fee[d].get(slot, 0)
-                if fee_pct == 99:
-                    users = 0
-                    deposit = 0
-                    fee_collected = 0
-                    nii = 0
-                    profit = 0
-                else:
-                    users = users_per_slab
-                    deposit = users * slab * d
-                    fee_collected = deposit * (fee_pct / 100) if fee_upfront else 0
-                    nii = deposit * ((kibor + spread) / 100 / 12)
-                    profit = fee_collected + nii - (deposit * (default_rate / 100))
-
-                results.append({
-                    "Month": m,
-                    "Duration": d,
-                    "Slab": slab,
-                    "Slot": slot,
-                    "Users": users,
-                    "Fee %": fee_pct,
-                    "Deposit": deposit,
-                    "Fee Collected": fee_collected,
-                    "NII": nii,
-                    "Profit": profit
-                })
-
-df = pd.DataFrame(results)
-df["Year"] = ((df["Month"] - 1) // 12) + 1
+cfg = V4Config(initial_tam=initial_tam, rest_period=rest_period, kibor=kibor,
+               spread=spread, default_rate=default_rate, fee_upfront=fee_upfront,
+               growth_rates=growth_rates, participation_caps=participation_caps,
+               durations=durations, duration_alloc=duration_alloc,
+               slot_fee=slot_fee, slabs=slabs, months=months)
+df = build_forecast_v4(cfg, mode=engine_mode)
 summary = df.groupby("Year")[["Users", "Deposit", "Fee Collected", "NII", "Profit"]].sum().reset_index()
 
 # UI Tabs
@@ -4,9 +4,10 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import io
 
+from bachat.legacy import V6Config, build_forecast_v6
+
 st.set_page_config(page_title="ROSCA Forecast App", layout="wide")
 st.title("ROSCA Forecast App - v6")
 
@@ -17,14 +18,17 @@ tam_percent = st.sidebar.slider("TAM %", 0, 100, 10)
 starting_user_percent = st.sidebar.slider("Starting User % of TAM", 0, 100, 10)
 monthly_growth = st.sidebar.slider("Monthly Growth %", 0.0, 10.0, 2.0)
 
-initial_tam = total_market * (tam_percent / 100)
-user_base = initial_tam * (starting_user_percent / 100)
-
 kibor = st.sidebar.slider("KIBOR (%)", 0.0, 25.0, 11.0)
 spread = st.sidebar.slider("Spread (%)", 0.0, 20.0, 5.0)
 default_rate = st.sidebar.slider("Default Rate (%)", 0.0, 10.0, 1.0)
 rest_period = st.sidebar.slider("Rest Period (months)", 0, 12, 1)
 fee_upfront = st.sidebar.radio("Fee Collected Upfront?", ["Yes", "No"]) == "Yes"
+months = st.sidebar.number_input("Forecast Horizon (months)", 1, 1200, 60)
+engine_mode = st.sidebar.selectbox(
+    "Forecast Engine", ["vectorized", "legacy"],
+    format_func=lambda m: {"vectorized": "Vectorized (cohort matrix)",
+                           "legacy": "Legacy (per-slot loop)"}[m],
+    help="Both produce the identical table; legacy runs the original v6 loop.")
 
 # Participation Caps
 st.sidebar.markdown("### Participation Cap Per Year")
@@ -42,47 +46,15 @@ st.sidebar.markdown("### Slot Fee Structure (Use 99 to block)")
 slot_fees = {d: {s: st.sidebar.number_input(f"{d}M - Slot {s} Fee %", 0, 100, max(0, 11 - s)) for s in range(1, d + 1)} for d in durations}
 
 # Forecast Engine
-months = 60
-results, user_pool, rejoining_track = [], user_base, [0]*months
-
-for m in range(1, months + 1):
-    new_users = user_pool if m == 1 else user_pool * (1 + monthly_growth / 100)
-    rejoining = rejoining_track[m-1] if m-1 < len(rejoining_track) else 0
-    total_users = new_users + rejoining
-
-    for d in durations:
-        if duration_alloc[d] == 0:
-            continue
-
-        users_by_duration = total_users * (duration_alloc[d] / 100)
-        per_slab_users = users_by_duration / len(slabs)
-
-        if (m + d + rest_period) < months:
-            rejoining_track[m + d + rest_period] += users_by_duration
-
-        for slab in slabs:
-            for slot in range(1, d + 1):
-                fee = slot_fees[d][slot]
-                if fee == 99:
-                    deposit, fee_collected, nii, profit, users = 0, 0, 0, 0, 0
-                else:
-                    users = per_slab_users
-                    deposit = users * slab * d
-                    fee_collected = deposit * (fee / 100) if fee_upfront else 0
-                    nii = deposit * ((kibor + spread) / 100 / 12)
-                    profit = fee_collected + nii - (deposit * default_rate / 100)
-
-                results.append({
-                    "Month": m, "Year": (m - 1) // 12 + 1, "Duration": d, "Slab": slab, "Slot": slot,
-                    "Users": users, "Fee %": fee, "Deposit": deposit,
-                    "Fee Collected": fee_collected, "NII": nii, "Profit": profit,
-                    "Rejoining Customers": rejoining if slot == 1 and slab == slabs[0] else 0
-                })
-
-    user_pool = total_users
+cfg = V6Config(total_market=total_market, tam_percent=tam_percent,
+               starting_user_percent=starting_user_percent, monthly_growth=monthly_growth,
+               kibor=kibor, spread=spread, default_rate=default_rate,
+               rest_period=rest_period, fee_upfront=fee_upfront,
+               participation_caps=participation_caps, durations=durations, slabs=slabs,
+               duration_alloc=duration_alloc, slot_fees=slot_fees, months=months)
+df = build_forecast_v6(cfg, mode=engine_mode)
 
 # DataFrame and Summary
-df = pd.DataFrame(results)
 summary = df.groupby("Year")[["Users", "Deposit", "Fee Collected", "NII", "Profit"]].sum().reset_index()
 
 # UI Display
@@ -0,0 +1,28 @@
+"""Cached and uncached bachat.models results must be the same frame."""
+
+import pandas as pd
+import pytest
+
+from bachat import (
+    FORECAST_DTYPES, BachatConfig, DiskForecastCache, ForecastCache,
+)
+from bachat.models import MODELS, run_model
+
+
+@pytest.mark.parametrize("dtypes", FORECAST_DTYPES)
+@pytest.mark.parametrize("name", list(MODELS))
+def test_cached_matches_uncached(name, dtypes, tmp_path):
+    expected = run_model(name)
+    for cache in (ForecastCache(dtypes=dtypes),
+                  ForecastCache(dtypes=dtypes,
+                                store=DiskForecastCache(str(tmp_path)))):
+        pd.testing.assert_frame_equal(run_model(name, cache=cache), expected)
+        pd.testing.assert_frame_equal(run_model(name, cache=cache), expected)
+
+
+def test_shared_cache_keeps_schemas_apart():
+    cache  = ForecastCache(dtypes="compact")
+    native = cache.forecast(BachatConfig())
+    common = run_model("ultimate", cache=cache)
+    assert "slab_amount" in native.columns
+    pd.testing.assert_frame_equal(common, run_model("ultimate"))